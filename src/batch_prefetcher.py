@@ -0,0 +1,110 @@
+import Queue
+import sys
+import threading
+
+
+class BatchPrefetcher(object):
+
+    def __init__(self, data_provider, num_batches=2, transform=None):
+        """
+
+        Iterates over the remaining training batches of a DataProvider, preparing the next batches
+        on a background thread while the current one is being processed. Reading the examples from
+        the (memory-mapped) dataset and the optional transform both happen on the worker thread.
+
+        Parameters
+        ----------
+        data_provider : DataProvider
+            The data provider to take batches from; it should have been reset for the current
+            training iteration.
+        num_batches : int
+            The maximum number of batches prepared in advance.
+        transform : function
+            An optional function applied to each batch on the worker thread (e.g. for data
+            augmentation, or decoding examples from disk), returning the batch to be used.
+
+        """
+        self._data_provider = data_provider
+        self._transform = transform
+
+        # Bounded, so that the worker never gets more than num_batches ahead
+        self._queue = Queue.Queue(maxsize=num_batches)
+        self._stop = threading.Event()
+
+        self._worker = threading.Thread(target=self._prefetch)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """
+
+        Returns
+        -------
+        Batch
+            The next training batch.
+
+        """
+        batch, error = self._queue.get()
+
+        if error is not None:
+            self.close()
+            raise error[0], error[1], error[2]
+        if batch is None:
+            self.close()
+            raise StopIteration()
+
+        return batch
+
+    def close(self):
+        """
+
+        Stops the worker thread, discarding the batches prepared in advance.
+
+        """
+        self._stop.set()
+        # Unblock the worker, in case it is waiting for space in the queue
+        while self._worker.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except Queue.Empty:
+                pass
+
+    def _prefetch(self):
+        """
+
+        Puts the remaining batches in the queue, followed by None, or the exception raised while
+        preparing a batch.
+
+        """
+        try:
+            batch = self._data_provider.get_next_batch()
+            while not (batch is None or self._stop.is_set()):
+                if self._transform is not None:
+                    batch = self._transform(batch)
+                self._put((batch, None))
+
+                batch = self._data_provider.get_next_batch()
+
+            self._put((None, None))
+        except Exception:
+            self._put((None, sys.exc_info()))
+
+    def _put(self, item):
+        """
+
+        Parameters
+        ----------
+        item : tuple
+            The (batch, exception info) pair to add to the queue once there is space, unless the
+            prefetcher is stopped in the meantime.
+
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except Queue.Full:
+                pass
@@ -0,0 +1,380 @@
+import argparse
+import json
+import numpy as np
+import os
+import platform
+import sys
+import timeit
+
+from convnet_layers.activation_layer import ActivationLayer
+from convnet_layers.conv_layer import ConvLayer
+from convnet_layers.fullyconnected_layer import FullyConnectedLayer
+from convnet_layers.globalpooling_layer import GlobalPoolingLayer
+from convnet_layers.maxpooling_layer import MaxPoolingLayer
+from convnet_layers.softmax_layer import SoftmaxLayer
+from data_provider import DataProvider
+
+
+SUITES = ['layers', 'network', 'data', 'epoch']
+
+# The preprocessed dataset used by the 'data' and 'epoch' suites
+DATASET_CACHE_DIR = '../../dataset_cache/'
+
+
+def network_layers():
+    """
+
+    Returns
+    -------
+    array of Layer objects
+        The CPU layers of the ten-genre network of classification.py, in order and with their
+        input shapes set for (128, 599) spectrograms.
+
+    """
+    layers = [ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
+              ActivationLayer('leakyReLU'),
+              MaxPoolingLayer((1, 4)),
+
+              ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
+              ActivationLayer('leakyReLU'),
+              MaxPoolingLayer((1, 2)),
+
+              ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
+              ActivationLayer('leakyReLU'),
+              GlobalPoolingLayer(),
+
+              FullyConnectedLayer(32, weight_scale=0.125),
+              ActivationLayer('leakyReLU'),
+              FullyConnectedLayer(32, weight_scale=0.125),
+              ActivationLayer('leakyReLU'),
+              FullyConnectedLayer(10, weight_scale=0.17),
+              SoftmaxLayer()]
+
+    shape = (128, 599)
+    for layer in layers:
+        layer.set_input_shape(shape)
+        shape = layer.get_output_shape()
+
+    return layers
+
+
+def measure(function, repeats=20, warmup=3):
+    """
+
+    Times a function, after calling it a few times to warm up the caches and the buffers of the
+    layers.
+
+    Parameters
+    ----------
+    function : function
+        The function to time, called without arguments.
+    repeats : int
+        The number of timed calls.
+    warmup : int
+        The number of calls made before timing.
+
+    Returns
+    -------
+    dict
+        The number of timed calls ('runs') and the mean, standard deviation, minimum, median, 90th
+        percentile and maximum of their wall times, in seconds.
+
+    """
+    for _ in range(warmup):
+        function()
+
+    times = np.empty(repeats)
+    for run in range(repeats):
+        start = timeit.default_timer()
+        function()
+        times[run] = timeit.default_timer() - start
+
+    return dict(runs=repeats, mean=np.mean(times), std=np.std(times), min=np.amin(times),
+                median=np.median(times), p90=np.percentile(times, 90), max=np.amax(times))
+
+
+def layer_benchmarks(repeats, warmup, batch_size):
+    """
+
+    Parameters
+    ----------
+    repeats : int
+        The number of timed calls of each benchmark.
+    warmup : int
+        The number of calls made before timing.
+    batch_size : int
+        The number of examples processed together.
+
+    Returns
+    -------
+    dict
+        The statistics of forward and back-propagation through each layer of the network, for its
+        input shape, indexed by names of the form 'layer.<index>.<type>.<phase>'.
+
+    """
+    results = {}
+    input_shape = (128, 599)
+    for index, layer in enumerate(network_layers()):
+        name = 'layer.%d.%s.' % (index, type(layer).__name__)
+        input = np.random.randn(batch_size, *input_shape)
+        input_shape = layer.get_output_shape()
+        output = layer.forward_prop(input)
+
+        results[name + 'forward'] = measure(lambda: layer.forward_prop(input), repeats, warmup)
+        results[name + 'inference'] = measure(lambda: layer.forward_prop(input, training=False),
+                                              repeats, warmup)
+
+        layer.forward_prop(input)
+        if isinstance(layer, SoftmaxLayer):
+            true_output = np.eye(output.shape[1])[np.random.randint(output.shape[1],
+                                                                    size=batch_size)]
+            results[name + 'backward'] = measure(lambda: layer.initial_gradient(output,
+                                                                                true_output),
+                                                 repeats, warmup)
+        else:
+            gradient = np.random.randn(*output.shape)
+            results[name + 'backward'] = measure(lambda: layer.back_prop(gradient), repeats,
+                                                 warmup)
+
+    return results
+
+
+def network_benchmarks(repeats, warmup, batch_size):
+    """
+
+    Parameters
+    ----------
+    repeats : int
+        The number of timed calls of each benchmark.
+    warmup : int
+        The number of calls made before timing.
+    batch_size : int
+        The number of examples processed together.
+
+    Returns
+    -------
+    dict
+        The statistics of inference and of forward and back-propagation through the whole network,
+        for a batch of spectrograms.
+
+    """
+    layers = network_layers()
+    input = np.random.randn(batch_size, 128, 599)
+    true_output = np.eye(10)[np.random.randint(10, size=batch_size)]
+
+    def inference():
+        current_input = input
+        for layer in layers:
+            current_input = layer.forward_prop(current_input, training=False)
+
+    def training():
+        current_input = input
+        for layer in layers:
+            current_input = layer.forward_prop(current_input)
+
+        current_gradient = layers[-1].initial_gradient(current_input, true_output)
+        for layer in reversed(layers[:-1]):
+            current_gradient = layer.back_prop(current_gradient)
+
+    return {'network.inference': measure(inference, repeats, warmup),
+            'network.forward_backward': measure(training, repeats, warmup)}
+
+
+def data_benchmarks(repeats, warmup, cache_dir):
+    """
+
+    Parameters
+    ----------
+    repeats : int
+        The number of timed calls of each benchmark.
+    warmup : int
+        The number of calls made before timing.
+    cache_dir : str
+        The directory of the preprocessed dataset.
+
+    Returns
+    -------
+    dict
+        The statistics of setting up the data provider from the cache and of reading all training
+        batches of an epoch.
+
+    """
+    data_provider = DataProvider(num_genres=10, cache_dir=cache_dir)
+
+    def epoch():
+        data_provider.reset()
+        for _ in iter(data_provider.get_next_batch, None):
+            pass
+
+    return {'data.setup': measure(data_provider.setup, repeats, warmup),
+            'data.epoch': measure(epoch, repeats, warmup)}
+
+
+def epoch_benchmarks(repeats, warmup, batch_size, cache_dir):
+    """
+
+    Parameters
+    ----------
+    repeats : int
+        The number of timed epochs.
+    warmup : int
+        The number of epochs trained before timing.
+    batch_size : int
+        The number of examples processed together.
+    cache_dir : str
+        The directory of the preprocessed dataset.
+
+    Returns
+    -------
+    dict
+        The statistics of training the network for one epoch, including the computation of the
+        training and test statistics.
+
+    """
+    from convnet import ConvNet
+
+    neural_net = ConvNet(network_layers(), DataProvider(num_genres=10, cache_dir=cache_dir))
+
+    return {'epoch.train': measure(lambda: neural_net.train(learning_rate=0.005, num_iters=1,
+                                                            batch_size=batch_size),
+                                   repeats, warmup)}
+
+
+def run_benchmarks(suites=SUITES, repeats=20, warmup=3, batch_size=10,
+                   cache_dir=DATASET_CACHE_DIR):
+    """
+
+    Runs the given benchmark suites. The 'data' and 'epoch' suites are skipped if the preprocessed
+    dataset does not exist.
+
+    Parameters
+    ----------
+    suites : array of str
+        The names of the suites, among SUITES.
+    repeats : int
+        The number of timed calls of each benchmark (the epochs are only timed repeats / 10 times).
+    warmup : int
+        The number of calls made before timing.
+    batch_size : int
+        The number of examples processed together.
+    cache_dir : str
+        The directory of the preprocessed dataset.
+
+    Returns
+    -------
+    dict
+        The description of the environment ('environment') and the statistics of each benchmark
+        ('benchmarks'), indexed by its name.
+
+    """
+    environment = dict(python=platform.python_version(), numpy=np.__version__,
+                       machine=platform.machine(), processor=platform.processor(),
+                       repeats=repeats, warmup=warmup, batch_size=batch_size)
+    benchmarks = {}
+
+    for suite in suites:
+        print "-----------> " + suite
+        if suite in ['data', 'epoch'] and not os.path.isdir(cache_dir):
+            print "Skipped: no dataset cache in " + cache_dir
+            continue
+
+        if suite == 'layers':
+            benchmarks.update(layer_benchmarks(repeats, warmup, batch_size))
+        elif suite == 'network':
+            benchmarks.update(network_benchmarks(repeats, warmup, batch_size))
+        elif suite == 'data':
+            benchmarks.update(data_benchmarks(repeats, warmup, cache_dir))
+        elif suite == 'epoch':
+            benchmarks.update(epoch_benchmarks(max(1, repeats / 10), min(1, warmup), batch_size,
+                                               cache_dir))
+        else:
+            raise ValueError("Unknown benchmark suite: " + suite)
+
+    return dict(environment=environment, benchmarks=benchmarks)
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+
+    Parameters
+    ----------
+    results : dict
+        The results of run_benchmarks().
+    baseline : dict
+        The stored results of an earlier run of run_benchmarks().
+    tolerance : float
+        The relative slowdown of the median time above which a benchmark is flagged.
+
+    Returns
+    -------
+    array of tuple
+        The name, baseline median and current median of each benchmark present in both results
+        which has regressed, sorted by name.
+
+    """
+    regressions = []
+    for name in sorted(results['benchmarks']):
+        if name in baseline['benchmarks']:
+            baseline_median = baseline['benchmarks'][name]['median']
+            median = results['benchmarks'][name]['median']
+            if median > baseline_median * (1 + tolerance):
+                regressions.append((name, baseline_median, median))
+
+    return regressions
+
+
+def main(argv):
+    """
+
+    Runs the benchmarks from the command line, writes their results as JSON and compares them with
+    a baseline.
+
+    Parameters
+    ----------
+    argv : array of str
+        The command-line arguments.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any benchmark has regressed, 0 otherwise.
+
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks of the CPU layers and the network.")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=SUITES)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--cache-dir', default=DATASET_CACHE_DIR)
+    parser.add_argument('--output', default='benchmarks.json',
+                        help="the file in which the results are written")
+    parser.add_argument('--baseline', help="the results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="the relative slowdown above which a benchmark is flagged")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.suites, args.repeats, args.warmup, args.batch_size,
+                             args.cache_dir)
+
+    for name in sorted(results['benchmarks']):
+        stats = results['benchmarks'][name]
+        print '%-45s median %10.6fs  p90 %10.6fs' % (name, stats['median'], stats['p90'])
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=1, sort_keys=True)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare(results, baseline, args.tolerance)
+        for name, baseline_median, median in regressions:
+            print 'REGRESSION %s: %.6fs -> %.6fs (%+.0f%%)' % (
+                name, baseline_median, median, 100 * (median / baseline_median - 1))
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
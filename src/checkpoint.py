@@ -0,0 +1,347 @@
+import json
+import numpy as np
+import os
+import struct
+import sys
+import threading
+
+
+# The first bytes of every checkpoint file
+CHECKPOINT_MAGIC = 'CONVNET\x00'
+CHECKPOINT_VERSION = 1
+
+# The arrays start at multiples of this number of bytes in the file, so that they can be used in
+# place from a memory map
+_ALIGNMENT = 64
+
+# The magic string, followed by the version and the length of the JSON header as 32-bit integers
+_PREFIX_FORMAT = '<8sII'
+
+
+def save_checkpoint(path, layers, input_shape, metadata=None):
+    """
+
+    Saves the architecture and the parameters of a network to a single file: a fixed prefix, a JSON
+    header describing the layers and the location of each parameter array, then the raw arrays,
+    each aligned to 64 bytes. The file is written under a temporary name first, so that an
+    interruption never leaves a truncated checkpoint.
+
+    Parameters
+    ----------
+    path : str
+        The path of the checkpoint file.
+    layers : array of Layer objects
+        The layers of the network, set up for their input shapes.
+    input_shape : tuple
+        The shape of the input of the network.
+    metadata : dict
+        Any other JSON-serialisable information to keep in the header.
+
+    """
+    architecture, arrays = describe_layers(layers)
+    _write_checkpoint(path, architecture, arrays, input_shape, metadata)
+
+
+class CheckpointWriter(object):
+
+    def __init__(self):
+        """
+
+        Saves checkpoints on a background thread, so that training does not wait for the disk.
+        Only a copy of the parameters is made on the calling thread. If a new checkpoint is
+        requested before the previous one has started being written, it replaces the previous one.
+
+        """
+        self._pending = None
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._worker = threading.Thread(target=self._write)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def save(self, path, layers, input_shape, metadata=None):
+        """
+
+        Copies the parameters of the layers and schedules the checkpoint to be written (see
+        save_checkpoint()).
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        layers : array of Layer objects
+            The layers of the network, set up for their input shapes.
+        input_shape : tuple
+            The shape of the input of the network.
+        metadata : dict
+            Any other JSON-serialisable information to keep in the header.
+
+        """
+        self._raise_error()
+
+        architecture, arrays = describe_layers(layers)
+        checkpoint = (path, architecture, [array.copy() for array in arrays], input_shape,
+                      metadata)
+        with self._condition:
+            self._pending = checkpoint
+            self._condition.notify()
+
+    def close(self):
+        """
+
+        Waits for the scheduled checkpoint to be written, then stops the background thread.
+
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+        self._raise_error()
+
+    def _write(self):
+        """
+
+        Writes the scheduled checkpoints until close() is called, keeping the first exception
+        raised.
+
+        """
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                checkpoint = self._pending
+                self._pending = None
+
+            try:
+                _write_checkpoint(*checkpoint)
+            except Exception:
+                if self._error is None:
+                    self._error = sys.exc_info()
+
+    def _raise_error(self):
+        """
+
+        Raises the exception of a failed write in the calling thread, if any.
+
+        """
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error[0], error[1], error[2]
+
+
+def read_checkpoint_header(path):
+    """
+
+    Parameters
+    ----------
+    path : str
+        The path of a checkpoint file written by save_checkpoint().
+
+    Returns
+    -------
+    dict
+        The header of the checkpoint: its version, the input shape of the network, the description
+        of each layer ('type', 'output_shape' and the location of its 'parameters') and the
+        metadata. The offset of the data section is added as 'data_start'.
+
+    """
+    with open(path, 'rb') as checkpoint_file:
+        prefix = checkpoint_file.read(struct.calcsize(_PREFIX_FORMAT))
+        if len(prefix) < struct.calcsize(_PREFIX_FORMAT):
+            raise ValueError(path + " is not a checkpoint file")
+
+        magic, version, header_length = struct.unpack(_PREFIX_FORMAT, prefix)
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(path + " is not a checkpoint file")
+        if version > CHECKPOINT_VERSION:
+            raise ValueError("Unsupported checkpoint version " + str(version) + " in " + path)
+
+        header = json.loads(checkpoint_file.read(header_length))
+
+    header['data_start'] = _align(struct.calcsize(_PREFIX_FORMAT) + header_length)
+    return header
+
+
+def load_checkpoint(path, layers, mode='r'):
+    """
+
+    Sets the parameters of the layers of a network to those saved in a checkpoint, after checking
+    that the architectures match. The whole file is memory-mapped once, and the parameters are
+    views of the map, so they are only read from the disk when they are used, and all processes
+    loading the same file share the same physical pages.
+
+    Parameters
+    ----------
+    path : str
+        The path of a checkpoint file written by save_checkpoint().
+    layers : array of Layer objects
+        The layers of the network, set up for their input shapes.
+    mode : str
+        'r' to map the parameters read-only (e.g. for prediction), or 'c' to map them
+        copy-on-write, so that they can be trained without changing the file.
+
+    Returns
+    -------
+    dict
+        The header of the checkpoint (see read_checkpoint_header()).
+
+    """
+    header = read_checkpoint_header(path)
+    if len(header['layers']) != len(layers):
+        raise ValueError("The checkpoint has " + str(len(header['layers'])) + " layers, the " +
+                         "network has " + str(len(layers)))
+
+    for layer, description in zip(layers, header['layers']):
+        if (description['type'] != type(layer).__name__.replace('CUDA', '') or
+                tuple(description['output_shape']) != layer.get_output_shape()):
+            raise ValueError("Layer " + type(layer).__name__ + " " +
+                             str(layer.get_output_shape()) + " does not match the checkpoint " +
+                             "layer " + description['type'] + " " +
+                             str(tuple(description['output_shape'])))
+
+    data = np.memmap(path, dtype=np.uint8, mode=mode)
+    for layer, description in zip(layers, header['layers']):
+        if not description['parameters']:
+            continue
+
+        parameters = []
+        for parameter, current in zip(description['parameters'], layer.get_parameters()):
+            start = header['data_start'] + parameter['offset']
+            dtype = np.dtype(str(parameter['dtype']))
+            array = data[start:start + int(np.prod(parameter['shape'])) * dtype.itemsize].\
+                view(dtype).reshape(parameter['shape'])
+
+            if array.shape != current.shape:
+                raise ValueError("Parameter of shape " + str(array.shape) + " in the checkpoint " +
+                                 "does not match shape " + str(current.shape))
+            # Only copied if the network uses another floating-point type
+            parameters.append(array.astype(current.dtype, copy=False))
+
+        layer.set_parameters(parameters)
+
+    return header
+
+
+def get_random_state():
+    """
+
+    Returns
+    -------
+    dict
+        The state of numpy's global random number generator, in a JSON-serialisable form.
+
+    """
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return dict(name=name, keys=keys.tolist(), position=position, has_gauss=has_gauss,
+                cached_gaussian=cached_gaussian)
+
+
+def set_random_state(state):
+    """
+
+    Parameters
+    ----------
+    state : dict
+        A state of numpy's global random number generator, as returned by get_random_state().
+
+    """
+    np.random.set_state((str(state['name']), np.array(state['keys'], dtype=np.uint32),
+                         state['position'], state['has_gauss'], state['cached_gaussian']))
+
+
+def describe_layers(layers):
+    """
+
+    Parameters
+    ----------
+    layers : array of Layer objects
+        The layers of the network, set up for their input shapes.
+
+    Returns
+    -------
+    tuple
+        The description of each layer for the header of a checkpoint, with the offset of each of
+        its parameters from the start of the data section, and the parameter arrays in the same
+        order.
+
+    """
+    architecture = []
+    arrays = []
+    data_size = 0
+    for layer in layers:
+        # The CPU and CUDA implementations of a layer type share their parameters
+        description = dict(type=type(layer).__name__.replace('CUDA', ''),
+                           output_shape=list(layer.get_output_shape()), parameters=[])
+
+        if hasattr(layer, 'get_parameters'):
+            for parameter in layer.get_parameters():
+                description['parameters'].append(dict(offset=data_size,
+                                                      shape=list(parameter.shape),
+                                                      dtype=parameter.dtype.str))
+                arrays.append(parameter)
+                data_size = _align(data_size + parameter.nbytes)
+
+        architecture.append(description)
+
+    return architecture, arrays
+
+
+def _write_checkpoint(path, architecture, arrays, input_shape, metadata):
+    """
+
+    Parameters
+    ----------
+    path : str
+        The path of the checkpoint file.
+    architecture : array of dict
+        The description of each layer (see describe_layers()).
+    arrays : array of numpy.array
+        The parameter arrays, in the order of the descriptions.
+    input_shape : tuple
+        The shape of the input of the network.
+    metadata : dict
+        Any other JSON-serialisable information to keep in the header.
+
+    """
+    parameters = [parameter for description in architecture
+                  for parameter in description['parameters']]
+    data_size = _align(parameters[-1]['offset'] + arrays[-1].nbytes) if parameters else 0
+
+    header = json.dumps(dict(version=CHECKPOINT_VERSION, input_shape=list(input_shape),
+                             layers=architecture, metadata=metadata or {}), sort_keys=True)
+    data_start = _align(struct.calcsize(_PREFIX_FORMAT) + len(header))
+
+    with open(path + '.tmp', 'wb') as checkpoint_file:
+        checkpoint_file.write(struct.pack(_PREFIX_FORMAT, CHECKPOINT_MAGIC, CHECKPOINT_VERSION,
+                                          len(header)))
+        checkpoint_file.write(header)
+
+        for parameter, array in zip(parameters, arrays):
+            checkpoint_file.seek(data_start + parameter['offset'])
+            checkpoint_file.write(np.ascontiguousarray(array).tostring())
+
+        # Make the length of the file a multiple of the alignment, even without parameters
+        checkpoint_file.truncate(data_start + data_size)
+    os.rename(path + '.tmp', path)
+
+
+def _align(offset):
+    """
+
+    Parameters
+    ----------
+    offset : int
+        An offset in bytes.
+
+    Returns
+    -------
+    int
+        The smallest multiple of the alignment which is not less than the offset.
+
+    """
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
@@ -1,35 +1,69 @@
+import os
+import sys
+
+if __name__ == '__main__':
+    # Use a single BLAS thread in each of the parallel runs, unless configured otherwise; this has
+    # to be set before numpy is first imported
+    for variable in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']:
+        os.environ.setdefault(variable, '1')
+
+import functools
 import time
 
 from convnet import ConvNet
-from convnet_layers.activation_layer import ActivationLayer
-from convnet_layers.conv_layer import ConvLayer
-from convnet_layers.globalpooling_layer import GlobalPoolingLayer
-from convnet_layers.fullyconnected_layer import FullyConnectedLayer
-from convnet_layers.maxpooling_layer_cuda import MaxPoolingLayerCUDA
-from convnet_layers.softmax_layer import SoftmaxLayer
-from data_provider import DataProvider
+from convnet_layers.backends import create_layer
+from data_provider import CACHE_INFO_FILE, DataProvider
+from experiment_runner import run_experiments
+
+
+# The preprocessed dataset, memory-mapped (read-only) by all runs
+DATASET_CACHE_DIR = '../../dataset_cache/'
+
+
+def network_layers(num_genres, output_weight_scale=0.17, backend='cpu'):
+    """
+
+    Parameters
+    ----------
+    num_genres : int
+        The number of genres classified by the network.
+    output_weight_scale : float
+        The weight scale of the last fully-connected layer.
+    backend : str
+        The backend of the layers (see convnet_layers.backends). The experiments use the CPU
+        layers, so that their results and running times do not depend on the host; an experiment
+        can opt in to 'cuda', or to 'auto' to use the CUDA layers if a GPU is present.
+
+    Returns
+    -------
+    array of Layer objects
+        The layers of the network used by all experiments.
+
+    """
+    new_layer = functools.partial(create_layer, backend=backend)
+    return [new_layer('conv', 32, (128, 4), weight_scale=0.044, padding_mode=False),
+            new_layer('activation', 'leakyReLU'),
+            new_layer('max_pooling', (1, 4)),
+
+            new_layer('conv', 32, (32, 4), weight_scale=0.088, padding_mode=False),
+            new_layer('activation', 'leakyReLU'),
+            new_layer('max_pooling', (1, 2)),
+
+            new_layer('conv', 32, (32, 4), weight_scale=0.088, padding_mode=False),
+            new_layer('activation', 'leakyReLU'),
+            new_layer('global_pooling'),
+
+            new_layer('fully_connected', 32, weight_scale=0.125),
+            new_layer('activation', 'leakyReLU'),
+            new_layer('fully_connected', 32, weight_scale=0.125),
+            new_layer('activation', 'leakyReLU'),
+            new_layer('fully_connected', num_genres, weight_scale=output_weight_scale),
+            new_layer('softmax')]
 
 
 def ten_class():
-    neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          GlobalPoolingLayer(),
-
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(10, weight_scale=0.17),
-                          SoftmaxLayer()],
-                         DataProvider(num_genres=10))
+    neural_net = ConvNet(network_layers(10),
+                         DataProvider(num_genres=10, cache_dir=DATASET_CACHE_DIR))
 
     neural_net.init_params_from_file(conv_only=True)
 
@@ -48,25 +82,8 @@ def ten_class():
 
 
 def eight_class():
-    neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          GlobalPoolingLayer(),
-
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(8, weight_scale=0.17),
-                          SoftmaxLayer()],
-                         DataProvider(num_genres=8))
+    neural_net = ConvNet(network_layers(8),
+                         DataProvider(num_genres=8, cache_dir=DATASET_CACHE_DIR))
 
     neural_net.init_params_from_file(conv_only=True)
 
@@ -85,25 +102,8 @@ def eight_class():
 
 
 def six_class(iter_idx):
-    neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          GlobalPoolingLayer(),
-
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(6, weight_scale=0.17),
-                          SoftmaxLayer()],
-                         DataProvider(num_genres=6))
+    neural_net = ConvNet(network_layers(6),
+                         DataProvider(num_genres=6, cache_dir=DATASET_CACHE_DIR))
 
     time1 = time.time()
     neural_net.train(learning_rate=0.005, num_iters=80, lrate_schedule=True)
@@ -117,27 +117,12 @@ def six_class(iter_idx):
     print 'Iteration ' + str(iter_idx)
     print neural_net.results
 
+    return neural_net.results
+
 
 def four_class(iter_idx):
-    neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          GlobalPoolingLayer(),
-
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(4, weight_scale=0.17),
-                          SoftmaxLayer()],
-                         DataProvider(num_genres=4))
+    neural_net = ConvNet(network_layers(4),
+                         DataProvider(num_genres=4, cache_dir=DATASET_CACHE_DIR))
 
     neural_net.setup_layers((128, 599), (4, ))
 
@@ -153,27 +138,12 @@ def four_class(iter_idx):
     print 'Iteration ' + str(iter_idx)
     print neural_net.results
 
+    return neural_net.results
+
 
 def two_class(iter_idx):
-    neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
-
-                          ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
-                          ActivationLayer('leakyReLU'),
-                          GlobalPoolingLayer(),
-
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(32, weight_scale=0.125),
-                          ActivationLayer('leakyReLU'),
-                          FullyConnectedLayer(2, weight_scale=0.1),
-                          SoftmaxLayer()],
-                         DataProvider(num_genres=2))
+    neural_net = ConvNet(network_layers(2, output_weight_scale=0.1),
+                         DataProvider(num_genres=2, cache_dir=DATASET_CACHE_DIR))
 
     time1 = time.time()
     neural_net.train(learning_rate=0.005, num_iters=40, lrate_schedule=True)
@@ -187,7 +157,15 @@ def two_class(iter_idx):
     print 'Iteration ' + str(iter_idx)
     print neural_net.results
 
+    return neural_net.results
+
 
 if __name__ == '__main__':
-    for i in range(5):
-        six_class(i + 26)
+    # Build the dataset cache once, before the runs memory-map it
+    if not os.path.exists(os.path.join(DATASET_CACHE_DIR, CACHE_INFO_FILE)):
+        DataProvider(num_genres=10).build_cache(DATASET_CACHE_DIR)
+
+    # The number of parallel runs can be given as an argument
+    run_experiments(six_class, range(26, 31),
+                    num_workers=int(sys.argv[1]) if len(sys.argv) > 1 else None,
+                    results_path='six_class_runs.json')
@@ -6,7 +6,7 @@ import matplotlib.pyplot as plt
 from convnet import ConvNet
 from convnet_layers.conv_layer import ConvLayer
 from convnet_layers.activation_layer import ActivationLayer
-from convnet_layers.maxpooling_layer_cuda import MaxPoolingLayerCUDA
+from convnet_layers.maxpooling_layer import MaxPoolingLayer
 from convnet_layers.globalpooling_layer import GlobalPoolingLayer
 from convnet_layers.fullyconnected_layer import FullyConnectedLayer
 from convnet_layers.softmax_layer import SoftmaxLayer
@@ -16,11 +16,11 @@ from data_provider import DataProvider
 if __name__ == '__main__':
     neural_net = ConvNet([ConvLayer(32, (128, 4), weight_scale=0.044, padding_mode=False),
                           ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 4)),
+                          MaxPoolingLayer((1, 4)),
 
                           ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
                           ActivationLayer('leakyReLU'),
-                          MaxPoolingLayerCUDA((1, 2)),
+                          MaxPoolingLayer((1, 2)),
 
                           ConvLayer(32, (32, 4), weight_scale=0.088, padding_mode=False),
                           ActivationLayer('leakyReLU'),
@@ -32,7 +32,8 @@ if __name__ == '__main__':
                           ActivationLayer('leakyReLU'),
                           FullyConnectedLayer(6, weight_scale=0.17),
                           SoftmaxLayer()],
-                         DataProvider(num_genres=6))
+                         DataProvider(num_genres=6,
+                                      cache_dir='../../dataset_cache/'))
 
     neural_net.setup_layers((128, 599), (6, ))
     neural_net.init_params_from_file()
@@ -1,14 +1,21 @@
+import functools
+import hashlib
+import json
 import numpy as np
+import os
 
+from batch_prefetcher import BatchPrefetcher
+from checkpoint import CheckpointWriter, describe_layers, get_random_state, load_checkpoint, \
+    save_checkpoint, set_random_state
+from data_parallel_trainer import DataParallelTrainer
+from layer_profiler import LayerProfiler
 from convnet_layers.conv_layer import ConvLayer
-from convnet_layers.conv_layer_cuda import ConvLayerCUDA
 from convnet_layers.fullyconnected_layer import FullyConnectedLayer
-from convnet_layers.fullyconnected_layer_cuda import FullyConnectedLayerCUDA
 
 
 class ConvNet(object):
 
-    def __init__(self, layers, data_provider):
+    def __init__(self, layers, data_provider, dtype=np.float64):
         """
 
         Parameters
@@ -16,10 +23,17 @@ class ConvNet(object):
         layers : array of Layer objects
             A sequence of layers representing the architecture of the neural network.
         data_provider : DataProvider
+        dtype : numpy.dtype
+            The floating-point type used by all layers for their parameters and computations, and
+            by the data provider for the examples it hands out (e.g. np.float32 to halve the memory
+            traffic).
 
         """
         self._layers = layers
         self._data_provider = data_provider
+        self._dtype = np.dtype(dtype)
+        self._data_provider.set_dtype(self._dtype)
+        self._profiler = None
         self.results = None
 
     def setup_layers(self, cnn_input_shape, cnn_output_shape):
@@ -37,6 +51,7 @@ class ConvNet(object):
         current_shape = cnn_input_shape
         print "OUTPUT shapes:"
         for layer in self._layers:
+            layer.set_dtype(self._dtype)
             layer.set_input_shape(current_shape)
             current_shape = layer.get_output_shape()
             print layer.__class__.__name__, current_shape
@@ -47,7 +62,9 @@ class ConvNet(object):
 
         # print "ConvNet setup successful!"
 
-    def train(self, learning_rate, num_iters, lrate_schedule=False):
+    def train(self, learning_rate, num_iters, lrate_schedule=False, batch_size=1, prefetch=0,
+              num_workers=1, hogwild=False, num_frozen_layers=0, feature_cache=None,
+              checkpoint_path=None, checkpoint_interval=0, resume=False):
         """
 
         Performs training of the neural network and saves the training and test statistics
@@ -62,8 +79,53 @@ class ConvNet(object):
         lrate_schedule : bool
             Whether a learning schedule is used. The implemented learning schedule is:
                 learning_rate(k) = (1 - (k-1)/num_iters) * learning_rate(0).
+        batch_size : int
+            The number of training examples processed together before each parameter update, with
+            the derivatives averaged over the minibatch. The batches from the data provider are
+            split into minibatches of (at most) this size, so it cannot exceed the size of these
+            batches (see DataProvider.get_batch_size()). The default of 1 trains in online mode,
+            one example at a time; larger values require all layers to support batched inputs.
+        prefetch : int
+            If positive, the number of batches prepared in advance on a background thread while
+            the current batch is being processed (see BatchPrefetcher).
+        num_workers : int
+            The number of worker processes among which each minibatch is split (see
+            DataParallelTrainer). The default of 1 trains in this process; more workers require
+            a batch_size larger than 1.
+        hogwild : bool
+            Whether the workers update the shared parameters directly, without synchronisation,
+            instead of combining their derivatives for each minibatch.
+        num_frozen_layers : int
+            The number of first layers whose parameters are not trained (e.g. the convolutional
+            layers initialised with init_params_from_file(conv_only=True)). Their output for each
+            example is computed once, before training, and only the following layers are trained
+            on it.
+        feature_cache : str
+            The path of a .npy file in which the output of the frozen layers is saved and from
+            which it is loaded by later runs (see DataProvider.compute_features()). It is saved
+            with a hash of the architecture and the parameters of the frozen layers, and a
+            ValueError is raised if they have changed since.
+        checkpoint_path : str
+            If given, the path of the checkpoint file (see save_checkpoint()) to which the state of
+            the training is saved at the end of each iteration, on a background thread. Besides
+            the parameters, it contains the position in the training, the learning rate schedule,
+            the state of the data provider and the state of numpy's random number generator.
+        checkpoint_interval : int
+            If positive, the state of the training is also saved after every checkpoint_interval
+            batches from the data provider. This requires prefetch to be 0.
+        resume : bool
+            Whether the training continues exactly from the checkpoint file, if it exists, instead
+            of starting from the initial parameters. The learning rate schedule must be the same.
 
         """
+        assert batch_size <= self._data_provider.get_batch_size(), \
+            "The batch_size cannot exceed the " + str(self._data_provider.get_batch_size()) + \
+            " examples of the batches from the data provider"
+        assert batch_size == 1 or self._supports_batch(), \
+            "A batch_size larger than 1 requires all layers to support batched inputs"
+        assert prefetch == 0 or checkpoint_interval == 0, \
+            "Checkpoints within an iteration require prefetch to be 0"
+
         self.results = dict(test=0.0, train=0.0, test_loss=0.0, train_loss=0.0,
                             conf_matrix=np.zeros((self._data_provider.get_output_shape()[0],
                                                   self._data_provider.get_output_shape()[0])))
@@ -73,44 +135,335 @@ class ConvNet(object):
                           self._data_provider.get_output_shape())
         self._data_provider.setup()
 
-        for it in range(num_iters):
-            print "ConvNet training: iteration #" + str(it + 1)
-
-            self._data_provider.reset()
-            batch = self._data_provider.get_next_batch()
-
-            # If available, use the next batch of training examples to train network
-            while not(batch is None):
-                for training_example in batch:
-                    # Forward propagation phase -- calculate output for training example
-                    current_input = training_example['spec']
-                    for layer in self._layers:
-                        current_input = layer.forward_prop(current_input)
-
-                    # Backpropagation phase
-                    predicted_output = current_input
-                    # Compute initial gradient at the output layer
-                    current_gradient = self._layers[-1].initial_gradient(predicted_output,
-                                                                         training_example['out'])
-                    for layer in reversed(self._layers[:-1]):
-                        # Compute gradient for each layer in reverse order
-                        current_gradient = layer.back_prop(current_gradient)
-
-                    # Update parameters - online mode
-                    for layer in self._layers:
-                        if type(layer) in [ConvLayer, ConvLayerCUDA, FullyConnectedLayer,
-                                           FullyConnectedLayerCUDA]:
-                            if lrate_schedule:
-                                layer.update_parameters(learning_rate * (num_iters - it + 1.0) /
-                                                        num_iters)
-                            else:
-                                layer.update_parameters(learning_rate)
-
-                batch = self._data_provider.get_next_batch()
+        # The learning rate schedule, which must be the same when resuming
+        schedule = dict(learning_rate=learning_rate, num_iters=num_iters,
+                        lrate_schedule=lrate_schedule)
+        start_iter, start_batch = 0, 0
+        if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+            start_iter, start_batch = self._resume_training(checkpoint_path, schedule)
+
+        if num_frozen_layers > 0:
+            input_shape = self._layers[num_frozen_layers - 1].get_output_shape()
+            self._data_provider.compute_features(
+                functools.partial(self._frozen_features, num_frozen_layers=num_frozen_layers),
+                cache_path=feature_cache, feature_shape=input_shape,
+                fingerprint=self._frozen_fingerprint(num_frozen_layers))
+        else:
+            input_shape = self._data_provider.get_input_shape()
+
+        if num_workers > 1:
+            assert batch_size > 1, "Data-parallel training requires a batch_size larger than 1"
+            trainer = DataParallelTrainer(self._parameter_layers(num_frozen_layers),
+                                          functools.partial(self._compute_derivatives,
+                                                            first_layer=num_frozen_layers),
+                                          input_shape, self._data_provider.get_output_shape(),
+                                          batch_size, num_workers=num_workers, hogwild=hogwild,
+                                          dtype=self._dtype)
+            train_step = trainer.train_step
+        else:
+            train_step = functools.partial(self._train_step, first_layer=num_frozen_layers)
+
+        writer = CheckpointWriter() if checkpoint_path is not None else None
+        try:
+            for it in range(start_iter, num_iters):
+                print "ConvNet training: iteration #" + str(it + 1)
+
+                if lrate_schedule:
+                    current_learning_rate = learning_rate * (num_iters - it + 1.0) / num_iters
+                else:
+                    current_learning_rate = learning_rate
+
+                if it == start_iter and start_batch > 0:
+                    # Continue the interrupted iteration from the restored data provider state
+                    num_batches = start_batch
+                else:
+                    self._data_provider.reset()
+                    num_batches = 0
+
+                if prefetch > 0:
+                    batches = BatchPrefetcher(self._data_provider, num_batches=prefetch)
+                else:
+                    batches = iter(self._data_provider.get_next_batch, None)
+
+                # Use each batch of training examples to train network
+                try:
+                    for batch in batches:
+                        true_outputs = self._one_hot(batch.labels)
+                        if batch_size == 1:
+                            for n in range(batch.specs.shape[0]):
+                                train_step(batch.specs[n], true_outputs[n], current_learning_rate)
+                        else:
+                            for start in range(0, batch.specs.shape[0], batch_size):
+                                train_step(batch.specs[start:start + batch_size],
+                                           true_outputs[start:start + batch_size],
+                                           current_learning_rate)
+
+                        num_batches += 1
+                        if writer is not None and checkpoint_interval > 0 and \
+                                num_batches % checkpoint_interval == 0:
+                            self._save_training_checkpoint(writer, checkpoint_path, it,
+                                                           num_batches, schedule)
+                finally:
+                    if prefetch > 0:
+                        batches.close()
+
+                if writer is not None:
+                    self._save_training_checkpoint(writer, checkpoint_path, it + 1, 0, schedule)
+        finally:
+            if writer is not None:
+                writer.close()
+            if num_workers > 1:
+                trainer.close()
+            # The statistics are computed by the whole network, from the spectrograms
+            self._data_provider.clear_features()
 
         self._record_training_stats()
         self._record_test_stats()
 
+    def _save_training_checkpoint(self, writer, path, iteration, batch, schedule):
+        """
+
+        Saves the state of the training on the background thread of a CheckpointWriter.
+
+        Parameters
+        ----------
+        writer : CheckpointWriter
+        path : str
+            The path of the checkpoint file.
+        iteration : int
+            The index of the current training iteration.
+        batch : int
+            The number of batches of the current iteration already used for training.
+        schedule : dict
+            The learning rate schedule.
+
+        """
+        metadata = dict(iteration=iteration, batch=batch, schedule=schedule,
+                        random_state=get_random_state(),
+                        data_provider=self._data_provider.get_state())
+        writer.save(path, self._layers, self._data_provider.get_input_shape(), metadata=metadata)
+
+    def _resume_training(self, path, schedule):
+        """
+
+        Restores the state of the training from a checkpoint saved by _save_training_checkpoint().
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        schedule : dict
+            The learning rate schedule of the current training.
+
+        Returns
+        -------
+        tuple
+            The index of the training iteration to continue, and the number of its batches already
+            used for training.
+
+        """
+        metadata = load_checkpoint(path, self._layers, mode='c')['metadata']
+        if metadata['schedule'] != schedule:
+            raise ValueError("The learning rate schedule " + str(schedule) + " does not match " +
+                             "the schedule " + str(metadata['schedule']) + " of " + path)
+
+        self._data_provider.set_state(metadata['data_provider'])
+        set_random_state(metadata['random_state'])
+
+        print "Resuming training from " + path + ": iteration #" + \
+              str(metadata['iteration'] + 1) + ", batch #" + str(metadata['batch'] + 1)
+        return metadata['iteration'], metadata['batch']
+
+    def _train_step(self, input, true_output, learning_rate, first_layer=0):
+        """
+
+        Performs forward and back-propagation for a single example or for a batch of examples, then
+        updates the parameters using the derivatives averaged over the batch.
+
+        Parameters
+        ----------
+        input : numpy.array
+            A spectrogram, or a batch of spectrograms stacked along the first axis.
+        true_output : numpy.array
+            The encoded correct output(s) for the input, stacked in the same way.
+        learning_rate : float
+            The learning rate for updating the parameters.
+        first_layer : int
+            The index of the first layer which is trained, the input being the output of the
+            previous layer.
+
+        """
+        self._compute_derivatives(input, true_output, first_layer=first_layer)
+
+        # The layers accumulate the sum of the derivatives over the batch
+        if true_output.ndim == 2:
+            learning_rate /= true_output.shape[0]
+
+        # Update parameters
+        for layer in self._parameter_layers(first_layer):
+            self._call_layer(layer, 'update', layer.update_parameters, learning_rate)
+
+    def _compute_derivatives(self, input, true_output, first_layer=0):
+        """
+
+        Performs forward and back-propagation for a single example or for a batch of examples, so
+        that the layers accumulate the derivatives of their parameters (summed over the batch).
+
+        Parameters
+        ----------
+        input : numpy.array
+            A spectrogram, or a batch of spectrograms stacked along the first axis.
+        true_output : numpy.array
+            The encoded correct output(s) for the input, stacked in the same way.
+        first_layer : int
+            The index of the first layer through which the input is propagated.
+
+        """
+        layers = self._layers[first_layer:]
+
+        # Forward propagation phase -- calculate output for training example(s)
+        current_input = input
+        for layer in layers:
+            current_input = self._call_layer(layer, 'forward', layer.forward_prop, current_input)
+
+        # Backpropagation phase
+        predicted_output = current_input
+        # Compute initial gradient at the output layer
+        current_gradient = self._call_layer(layers[-1], 'backward', layers[-1].initial_gradient,
+                                            predicted_output, true_output)
+        for layer in reversed(layers[:-1]):
+            # Compute gradient for each layer in reverse order
+            current_gradient = self._call_layer(layer, 'backward', layer.back_prop,
+                                                current_gradient)
+
+    def _frozen_features(self, inputs, num_frozen_layers):
+        """
+
+        Parameters
+        ----------
+        inputs : numpy.array
+            A batch of spectrograms stacked along the first axis.
+        num_frozen_layers : int
+            The number of first layers of the network which are not trained.
+
+        Returns
+        -------
+        numpy.array
+            The outputs of the last frozen layer for the inputs, stacked in the same way.
+
+        """
+        current_input = inputs
+        for layer in self._layers[:num_frozen_layers]:
+            current_input = self._call_layer(layer, 'forward', layer.forward_prop, current_input,
+                                             training=False)
+
+        return current_input
+
+    def _frozen_fingerprint(self, num_frozen_layers):
+        """
+
+        Parameters
+        ----------
+        num_frozen_layers : int
+            The number of first layers of the network which are not trained.
+
+        Returns
+        -------
+        str
+            The MD5 hash of the description (see describe_layers()) and of the parameters of the
+            frozen layers, which identifies the features they compute.
+
+        """
+        architecture, arrays = describe_layers(self._layers[:num_frozen_layers])
+        md5 = hashlib.md5(json.dumps(architecture, sort_keys=True))
+        for array in arrays:
+            md5.update(np.ascontiguousarray(array).tostring())
+        return md5.hexdigest()
+
+    def enable_profiling(self, callback=None):
+        """
+
+        Starts recording the cost of each layer in each phase (forward, backward and update) during
+        training and prediction in this process. The calls made by the worker processes of
+        data-parallel training are not recorded.
+
+        Parameters
+        ----------
+        callback : function
+            If given, called after each layer call (see LayerProfiler).
+
+        Returns
+        -------
+        LayerProfiler
+            The profiler, whose report() gives the costs recorded so far.
+
+        """
+        self._profiler = LayerProfiler(self._layers, callback=callback)
+        return self._profiler
+
+    def disable_profiling(self):
+        """
+
+        Stops recording the cost of the layers.
+
+        """
+        self._profiler = None
+
+    def _call_layer(self, layer, phase, function, *args, **kwargs):
+        """
+
+        Calls a method of a layer, recording its cost if profiling is enabled.
+
+        Parameters
+        ----------
+        layer : Layer
+            The layer whose method is called.
+        phase : str
+            'forward', 'backward' or 'update'.
+        function : function
+            The method of the layer.
+        *args, **kwargs
+            The arguments of the method.
+
+        Returns
+        -------
+        object
+            The result of the method.
+
+        """
+        if self._profiler is None:
+            return function(*args, **kwargs)
+        return self._profiler.call(layer, phase, function, *args, **kwargs)
+
+    def _parameter_layers(self, first_layer=0):
+        """
+
+        Parameters
+        ----------
+        first_layer : int
+            The index of the first layer which is considered.
+
+        Returns
+        -------
+        array of Layer objects
+            The layers of the network which have parameters (convolutional and fully-connected
+            layers), in order.
+
+        """
+        return [layer for layer in self._layers[first_layer:]
+                if isinstance(layer, (ConvLayer, FullyConnectedLayer))]
+
+    def _supports_batch(self):
+        """
+
+        Returns
+        -------
+        bool
+            Whether all layers accept batches of examples stacked along the first axis.
+
+        """
+        return all(layer.supports_batch for layer in self._layers)
+
     def _record_training_stats(self):
         """
 
@@ -120,23 +473,16 @@ class ConvNet(object):
 
         """
         batch = self._data_provider.get_all_training_data()
-        error = 0.0
-        loss = 0.0
-
-        for training_example in batch:
-            current_input = training_example['spec']
-            for layer in self._layers:
-                current_input = layer.forward_prop(current_input)
+        outputs = self.predict_batch(batch.specs)
 
-            loss += self._layers[-1].loss(current_input, training_example['out'])
-            if np.argmax(current_input) != np.argmax(training_example['out']):
-                error += 1.0
+        loss = self._layers[-1].loss(outputs, self._one_hot(batch.labels))
+        error = float(np.sum(np.argmax(outputs, axis=1) != batch.labels))
 
-        print "\nTraining error:\n", error / batch.shape[0]
-        print "\nTraining loss:\n", loss / batch.shape[0]
+        print "\nTraining error:\n", error / batch.specs.shape[0]
+        print "\nTraining loss:\n", loss / batch.specs.shape[0]
 
-        self.results['train'] = error / batch.shape[0]
-        self.results['train_loss'] = loss / batch.shape[0]
+        self.results['train'] = error / batch.specs.shape[0]
+        self.results['train_loss'] = loss / batch.specs.shape[0]
 
     def _record_test_stats(self):
         """
@@ -147,25 +493,43 @@ class ConvNet(object):
 
         """
         test_data = self._data_provider.get_test_data()
+        true_outputs = self._one_hot(test_data.labels)
         test_error = 0.0
         test_loss = 0.0
 
-        for test_example in test_data:
-            output = self.predict(test_example['spec'])
-            print "Actual ", str(np.argmax(test_example['out']))
-            self.results['conf_matrix'][np.argmax(test_example['out'])][np.argmax(output)] += 1
+        for n in range(test_data.specs.shape[0]):
+            output = self.predict(test_data.specs[n])
+            print "Actual ", str(test_data.labels[n])
+            self.results['conf_matrix'][test_data.labels[n]][np.argmax(output)] += 1
 
-            test_loss +=  self._layers[-1].loss(output, test_example['out'])
-            if np.argmax(output) != np.argmax(test_example['out']):
+            test_loss +=  self._layers[-1].loss(output, true_outputs[n])
+            if np.argmax(output) != test_data.labels[n]:
                 test_error += 1.0
 
-        print "Test error:", test_error / test_data.shape[0]
-        print "Test loss:", test_loss / test_data.shape[0]
+        print "Test error:", test_error / test_data.specs.shape[0]
+        print "Test loss:", test_loss / test_data.specs.shape[0]
 
-        self.results['test'] = test_error / test_data.shape[0]
-        self.results['test_loss'] = test_loss / test_data.shape[0]
+        self.results['test'] = test_error / test_data.specs.shape[0]
+        self.results['test_loss'] = test_loss / test_data.specs.shape[0]
 
-    def predict(self, input):
+    def _one_hot(self, labels):
+        """
+
+        Parameters
+        ----------
+        labels : array of int
+            The genre indices of a batch of examples.
+
+        Returns
+        -------
+        array of double
+            The encoded correct outputs of the network for the examples, one per row
+            (output[index(genre)] = 1 and output[i] = 0 otherwise).
+
+        """
+        return np.eye(self._data_provider.get_output_shape()[0], dtype=self._dtype)[labels]
+
+    def predict(self, input, context=None):
         """
 
         Processes the input and returns the predicted class.
@@ -174,6 +538,9 @@ class ConvNet(object):
         ----------
         input : numpy.array
             A spectrogram of the audio file we wish to classify.
+        context : ForwardContext
+            If given, the layers keep their per-call state in this context, so that several
+            threads can use the network at the same time (each with its own context).
 
         Returns
         -------
@@ -192,15 +559,66 @@ class ConvNet(object):
                 9 - 'rock'
 
         """
-        # Forward propagation
+        # Forward propagation, without keeping any state for back-propagation
         current_input = input
         for layer in self._layers:
-            current_input = layer.forward_prop(current_input)
+            current_input = self._call_layer(layer, 'forward', layer.forward_prop, current_input,
+                                             training=False, context=context)
 
         # Compute predicted output
         print "Predicted ", current_input
         return current_input
 
+    def predict_batch(self, inputs, batch_size=32, context=None):
+        """
+
+        Processes several inputs, stacked together, and returns the predicted classes without
+        printing anything. If a layer does not support batched inputs (e.g. the CUDA layers), the
+        inputs are processed one at a time instead.
+
+        Parameters
+        ----------
+        inputs : numpy.array
+            The spectrograms of the audio files we wish to classify, stacked along the first axis
+            (e.g. the specs of a Batch).
+        batch_size : int
+            The maximum number of inputs processed together, which bounds the memory used by the
+            intermediate results.
+        context : ForwardContext
+            If given, the layers keep their per-call state in this context, so that several
+            threads can use the network at the same time (each with its own context).
+
+        Returns
+        -------
+        numpy.array
+            An array of shape (N, num_genres), in which each row contains the probabilities of the
+            corresponding input belonging to each genre (in the order given in predict()).
+
+        """
+        outputs = np.empty((inputs.shape[0],) + self._layers[-1].get_output_shape(),
+                           dtype=self._dtype)
+
+        if not self._supports_batch():
+            for n in range(inputs.shape[0]):
+                current_input = inputs[n]
+                for layer in self._layers:
+                    current_input = self._call_layer(layer, 'forward', layer.forward_prop,
+                                                     current_input, training=False,
+                                                     context=context)
+                outputs[n] = current_input
+            return outputs
+
+        for start in range(0, inputs.shape[0], batch_size):
+            # Forward propagation, without keeping any state for back-propagation
+            current_input = inputs[start:start + batch_size]
+            for layer in self._layers:
+                current_input = self._call_layer(layer, 'forward', layer.forward_prop,
+                                                 current_input, training=False, context=context)
+
+            outputs[start:start + batch_size] = current_input
+
+        return outputs
+
     def serialise_params(self):
         """
 
@@ -210,8 +628,7 @@ class ConvNet(object):
         count = 0
 
         for layer in self._layers:
-            if type(layer) in [ConvLayer, ConvLayerCUDA, FullyConnectedLayer,
-                               FullyConnectedLayerCUDA]:
+            if isinstance(layer, (ConvLayer, FullyConnectedLayer)):
                 count += 1
                 layer.serialise_parameters(count)
 
@@ -231,16 +648,57 @@ class ConvNet(object):
 
         for layer in self._layers:
             if conv_only:
-                if type(layer) in [ConvLayer, ConvLayerCUDA]:
+                if isinstance(layer, ConvLayer):
                     count += 1
                     layer.init_parameters_from_file(count)
                     print 'Weights initialised in layer Conv' + str(count)
             else:
-                if type(layer) in [ConvLayer, ConvLayerCUDA, FullyConnectedLayer,
-                                   FullyConnectedLayerCUDA]:
+                if isinstance(layer, (ConvLayer, FullyConnectedLayer)):
                     count += 1
                     layer.init_parameters_from_file(count)
 
+    def save_checkpoint(self, path, metadata=None):
+        """
+
+        Saves the architecture and the parameters of the network to a single checkpoint file (see
+        checkpoint.save_checkpoint()). The layers must have been set up, e.g. by training.
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        metadata : dict
+            Any other JSON-serialisable information to keep in the checkpoint.
+
+        """
+        save_checkpoint(path, self._layers, self._data_provider.get_input_shape(),
+                        metadata=metadata)
+
+    def load_checkpoint(self, path, mode='r'):
+        """
+
+        Sets up the layers and memory-maps their parameters from a checkpoint file written by
+        save_checkpoint(), e.g. before predicting. Since train() initialises the layers again,
+        this is not meant to be followed by training.
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        mode : str
+            'r' to map the parameters read-only, so that all processes loading the checkpoint share
+            them, or 'c' to map them copy-on-write.
+
+        Returns
+        -------
+        dict
+            The metadata saved in the checkpoint.
+
+        """
+        self.setup_layers(self._data_provider.get_input_shape(),
+                          self._data_provider.get_output_shape())
+        return load_checkpoint(path, self._layers, mode=mode)['metadata']
+
     def test_data_activations_for_conv_layer(self, layer_id, genre):
         """
 
@@ -266,16 +724,14 @@ class ConvNet(object):
         """
         self._data_provider.setup()
         test_data = self._data_provider.get_test_data_for_genre(genre)
-        activations_for_test_data = np.empty(test_data.shape, dtype=dict)
+        activations_for_test_data = np.empty(test_data.specs.shape[0], dtype=dict)
 
-        example_count = -1
-        for example in test_data:
+        for example_count in range(test_data.specs.shape[0]):
             count = 0
-            example_count += 1
 
-            current_input = example['spec']
+            current_input = test_data.specs[example_count]
             for layer in self._layers:
-                current_input = layer.forward_prop(current_input)
+                current_input = layer.forward_prop(current_input, training=False)
                 if type(layer) == ConvLayer:
                     count += 1
 
@@ -284,8 +740,9 @@ class ConvNet(object):
 
             activations_for_test_data[example_count] = {
                 'filter_activations': current_input,
-                'class_prob': self.predict(example['spec'])[np.argmax(example['out'])],
-                'id': example['id'],
+                'class_prob': self.predict(test_data.specs[example_count])[
+                    test_data.labels[example_count]],
+                'id': test_data.ids[example_count],
             }
 
         return activations_for_test_data
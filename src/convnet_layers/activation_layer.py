@@ -26,13 +26,20 @@ class ActivationLayer(Layer):
         self._input_shape = None
         self._current_input = None
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
@@ -40,17 +47,20 @@ class ActivationLayer(Layer):
             The result of the layer applying the activation function to the input.
 
         """
-        assert self._input_shape == input.shape, "Input does not have correct shape"
-        self._current_input = input
+        self._is_batch(input)
+        if training:
+            self._state(context)._current_input = input
         return self._activation_fn(input)
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
@@ -58,7 +68,7 @@ class ActivationLayer(Layer):
             The gradient computed by this layer.
 
         """
-        return output_grad * self._d_activation_fn(self._current_input)
+        return output_grad * self._d_activation_fn(self._state(context)._current_input)
 
     def set_input_shape(self, shape):
         """
@@ -9,6 +9,9 @@ from pycuda.compiler import SourceModule
 
 class ActivationLayerCUDA(ActivationLayer):
 
+    # The CUDA kernels only process a single example at a time
+    supports_batch = False
+
     def __init__(self, activation_fn):
         """
 
@@ -26,13 +29,17 @@ class ActivationLayerCUDA(ActivationLayer):
             """)
         super(ActivationLayerCUDA, self).__init__(activation_fn)
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: the state for back-propagation is always kept.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -76,13 +83,15 @@ class ActivationLayerCUDA(ActivationLayer):
 
         return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
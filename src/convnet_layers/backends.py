@@ -0,0 +1,165 @@
+"""
+The registry of the CPU and CUDA implementations of each layer type.
+
+The 'auto' backend checks for a GPU, by importing pycuda and initialising the CUDA driver, the
+first time it is asked for a layer type which the CUDA layers support. Setting the environment
+variable CONVNET_BACKEND=cpu makes the CPU implementations the default and disables this check,
+so that pycuda is never imported.
+
+"""
+import numpy as np
+import os
+
+from activation_layer import ActivationLayer
+from conv_layer import ConvLayer
+from fullyconnected_layer import FullyConnectedLayer
+from globalpooling_layer import GlobalPoolingLayer
+from maxpooling_layer import MaxPoolingLayer
+from softmax_layer import SoftmaxLayer
+
+
+BACKENDS = ['cpu', 'cuda']
+
+# The backend used when none is given: 'cpu', 'cuda', or 'auto' to use CUDA only if a GPU is
+# present and the CUDA layers support the needs of the network (see get_layer_class())
+DEFAULT_BACKEND = os.environ.get('CONVNET_BACKEND', 'auto')
+
+# The implementations of each layer type for each backend: either a class, or the module and name
+# of a class which is only imported when first requested, since importing the CUDA layers
+# initialises the CUDA driver
+_registry = {
+    'activation': {'cpu': ActivationLayer,
+                   'cuda': ('activation_layer_cuda', 'ActivationLayerCUDA')},
+    'conv': {'cpu': ConvLayer,
+             'cuda': ('conv_layer_cuda', 'ConvLayerCUDA')},
+    'fully_connected': {'cpu': FullyConnectedLayer,
+                        'cuda': ('fullyconnected_layer_cuda', 'FullyConnectedLayerCUDA')},
+    'global_pooling': {'cpu': GlobalPoolingLayer,
+                       'cuda': ('globalpooling_layer_cuda', 'GlobalPoolingLayerCUDA')},
+    'max_pooling': {'cpu': MaxPoolingLayer,
+                    'cuda': ('maxpooling_layer_cuda', 'MaxPoolingLayerCUDA')},
+    'softmax': {'cpu': SoftmaxLayer},
+}
+
+# Whether a GPU can be used, once checked
+_cuda_available = None
+
+
+def register_layer(layer_type, backend, implementation):
+    """
+
+    Adds or replaces the implementation of a layer type for a backend.
+
+    Parameters
+    ----------
+    layer_type : str
+        The name of the layer type (e.g. 'conv').
+    backend : str
+        The name of the backend, among BACKENDS.
+    implementation : class or tuple
+        The Layer class, or the name of its module in convnet_layers and the name of the class, to
+        import it only when it is first requested.
+
+    """
+    assert backend in BACKENDS, "Unknown backend: " + backend
+    _registry.setdefault(layer_type, {})[backend] = implementation
+
+
+def get_layer_class(layer_type, backend=None, batched=False, dtype=np.float64):
+    """
+
+    Parameters
+    ----------
+    layer_type : str
+        The name of the layer type: 'activation', 'conv', 'fully_connected', 'global_pooling',
+        'max_pooling' or 'softmax'.
+    backend : str
+        'cpu', 'cuda', or 'auto' (by default, DEFAULT_BACKEND). 'auto' uses the CUDA
+        implementation only if a GPU is present and the network processes single float64
+        examples, which is all the CUDA layers support; otherwise it uses the CPU implementation.
+        The CPU implementation is also used for the layer types without a CUDA implementation.
+    batched : bool
+        Whether the network processes batches of examples (e.g. trained with a batch_size larger
+        than 1).
+    dtype : numpy.dtype
+        The floating-point type of the network.
+
+    Returns
+    -------
+    class
+        The Layer class implementing the layer type for the backend.
+
+    """
+    if layer_type not in _registry:
+        raise ValueError("Unknown layer type: " + layer_type)
+
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'auto':
+        supported = not batched and np.dtype(dtype) == np.float64
+        backend = 'cuda' if supported and cuda_available() else 'cpu'
+    elif backend not in BACKENDS:
+        raise ValueError("Unknown backend: " + backend)
+
+    implementations = _registry[layer_type]
+    if backend not in implementations:
+        backend = 'cpu'
+
+    implementation = implementations[backend]
+    if isinstance(implementation, tuple):
+        module_name, class_name = implementation
+        implementation = getattr(__import__(module_name, globals(), locals(), [class_name]),
+                                 class_name)
+        implementations[backend] = implementation
+
+    return implementation
+
+
+def create_layer(layer_type, *args, **kwargs):
+    """
+
+    Parameters
+    ----------
+    layer_type : str
+        The name of the layer type (see get_layer_class()).
+    *args, **kwargs
+        The arguments of the constructor of the layer, and optionally the backend and the needs
+        of the network, batched and dtype (see get_layer_class()).
+
+    Returns
+    -------
+    Layer
+        A new layer of the given type, implemented by the given backend.
+
+    """
+    backend = kwargs.pop('backend', None)
+    batched = kwargs.pop('batched', False)
+    dtype = kwargs.pop('dtype', np.float64)
+    return get_layer_class(layer_type, backend, batched, dtype)(*args, **kwargs)
+
+
+def cuda_available():
+    """
+
+    Checks whether pycuda is installed and a GPU is present, without creating a CUDA context.
+    Nothing is imported if the environment variable CONVNET_BACKEND is 'cpu'.
+
+    Returns
+    -------
+    bool
+        Whether the CUDA layers can be used.
+
+    """
+    global _cuda_available
+    if os.environ.get('CONVNET_BACKEND') == 'cpu':
+        return False
+
+    if _cuda_available is None:
+        try:
+            import pycuda.driver as driver
+            driver.init()
+            _cuda_available = driver.Device.count() > 0
+        except Exception:
+            # pycuda is missing, or the driver cannot be initialised
+            _cuda_available = False
+
+    return _cuda_available
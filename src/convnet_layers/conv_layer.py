@@ -2,6 +2,7 @@ import numpy as np
 import time
 
 from layer import Layer
+from util.im2col import col2im, im2col, sliding_windows
 
 
 class ConvLayer(Layer):
@@ -47,13 +48,23 @@ class ConvLayer(Layer):
         self._input_shape = None
         self._current_padded_input = None
 
-    def forward_prop(self, input):
+        # Scratch arrays reused across calls, indexed by name and shape
+        self._buffers = {}
+
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
@@ -61,37 +72,44 @@ class ConvLayer(Layer):
             The result of the convolutional layer processing the input.
 
         """
-        assert self._input_shape == input.shape, "Input does not have correct shape"
-
-        padded_input = np.zeros((self._input_shape[0],
-                                 self._input_shape[1] + self._num_padding_zeros))
-        padded_input[:, self._num_padding_zeros / 2:
-                        self._num_padding_zeros / 2 + self._input_shape[1]] = input
-        self._current_padded_input = padded_input
-
-        output = np.empty(self.get_output_shape())
-
-        filter_w = self._filter_shape[1]
-        range_w = self.get_output_shape()[1]
-
-        # For each filter / row in the output
-        for f in range(self._num_filters):
-            # For each valid convolution index
-            for w in range(range_w):
-                # Compute the dot product between the filter weight matrix and the overlapped input
-                # sub-matrix and then add the bias value for the current filter
-                output[f][w] = np.sum(np.multiply(self._filter_weights[f],
-                                                  padded_input[:, w:w+filter_w])) + self._biases[f]
+        self._is_batch(input)
+
+        # Pad the last axis, so that a batch of inputs is padded example by example
+        pad = self._num_padding_zeros / 2
+        padded_shape = input.shape[:-1] + (input.shape[-1] + self._num_padding_zeros,)
+        if training:
+            padded_input = np.zeros(padded_shape, dtype=self._dtype)
+            padded_input[..., pad:pad + self._input_shape[1]] = input
+            self._state(context)._current_padded_input = padded_input
+        elif self._num_padding_zeros == 0:
+            padded_input = input.astype(self._dtype, copy=False)
+        else:
+            # Reuse the same scratch array for every inference call
+            padded_input = self._get_buffer('padded_input', padded_shape, context)
+            padded_input[..., :pad] = 0
+            padded_input[..., pad:pad + self._input_shape[1]] = input
+            padded_input[..., pad + self._input_shape[1]:] = 0
+
+        # Unroll every window of the padded input(s) into a row, so that all filters can be applied
+        # to all windows with a single matrix multiplication
+        input_cols = im2col(padded_input, self._filter_shape[1])
+        output = np.dot(input_cols.reshape(-1, input_cols.shape[-1]),
+                        self._filter_weights.reshape(self._num_filters, -1).T)
+        output = np.swapaxes(output.reshape(input_cols.shape[:-1] + (self._num_filters,)), -1, -2)
+        # Add the bias value for each filter
+        output += self._biases[:, np.newaxis]
 
         return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
@@ -99,27 +117,35 @@ class ConvLayer(Layer):
             The gradient computed by this layer.
 
         """
-        padded_input_grad = np.zeros((self._input_shape[0],
-                                      self._input_shape[1] + self._num_padding_zeros))
-
-        range_w = self.get_output_shape()[1]
         filter_w = self._filter_shape[1]
-        # For each valid convolution result index within the gradient length
-        for w in range(range_w):
-            # For each filter in the layer
-            for f in range(self._num_filters):
-                # Compute the contribution of the current gradient location for the current filter
-                # to the new gradient
-                padded_input_grad[:, w:w + filter_w] += output_grad[f][w] * self._filter_weights[f]
-                # Update derivative for the current filter weight matrix
-                self._d_filter_weights[f] += output_grad[f][w] * \
-                                             self._current_padded_input[:, w:w + filter_w]
+        current_padded_input = self._state(context)._current_padded_input
+
+        if output_grad.ndim == 3:
+            # The derivatives are summed over all examples in the batch, as well as over all
+            # convolution indices
+            grad_axes, window_axes = [0, 2], [0, 1]
+        else:
+            grad_axes, window_axes = [1], [0]
+
+        # Update derivative for the filter weights, contracting the gradient with every window of
+        # the padded input over the convolution index
+        self._d_filter_weights += np.tensordot(output_grad,
+                                               sliding_windows(current_padded_input, filter_w),
+                                               axes=(grad_axes, window_axes))
+
+        # Compute the contribution of each gradient location to its window (a transposed
+        # convolution) and then scatter-add the windows back onto the padded input
+        output_grad_rows = np.swapaxes(output_grad, -1, -2)
+        input_grad_cols = np.dot(output_grad_rows.reshape(-1, self._num_filters),
+                                 self._filter_weights.reshape(self._num_filters, -1))
+        input_grad_cols = input_grad_cols.reshape(output_grad_rows.shape[:-1] + (-1,))
+        padded_input_grad = col2im(input_grad_cols, current_padded_input.shape, filter_w)
 
         # Compute biases derivative
-        self._d_biases += np.sum(output_grad, axis=1)
+        self._d_biases += np.sum(output_grad, axis=tuple(grad_axes))
 
-        return padded_input_grad[:, self._num_padding_zeros / 2:self._input_shape[1] +
-                                                                self._num_padding_zeros / 2]
+        return padded_input_grad[..., self._num_padding_zeros / 2:self._input_shape[1] +
+                                                                  self._num_padding_zeros / 2]
 
     def set_input_shape(self, shape):
         """
@@ -145,6 +171,58 @@ class ConvLayer(Layer):
                  self._input_shape[1] + self._num_padding_zeros - self._filter_shape[1] + 1)
         return shape
 
+    def set_dtype(self, dtype):
+        """
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            The floating-point type in which this layer stores its parameters and computes its
+            outputs and gradients.
+
+        """
+        super(ConvLayer, self).set_dtype(dtype)
+
+        self._filter_weights = self._filter_weights.astype(self._dtype)
+        self._d_filter_weights = self._d_filter_weights.astype(self._dtype)
+        self._biases = self._biases.astype(self._dtype)
+        self._d_biases = self._d_biases.astype(self._dtype)
+
+    def get_parameters(self):
+        """
+
+        Returns
+        -------
+        list of numpy.array
+            The parameters of this layer: the filter weights and the biases.
+
+        """
+        return [self._filter_weights, self._biases]
+
+    def get_derivatives(self):
+        """
+
+        Returns
+        -------
+        list of numpy.array
+            The derivatives accumulated for the parameters of this layer since the last update, in
+            the same order as get_parameters().
+
+        """
+        return [self._d_filter_weights, self._d_biases]
+
+    def set_parameters(self, parameters):
+        """
+
+        Parameters
+        ----------
+        parameters : list of numpy.array
+            The new parameters of this layer, in the same order as get_parameters(). The arrays are
+            used directly (e.g. they may live in shared memory), not copied.
+
+        """
+        self._filter_weights, self._biases = parameters
+
     def update_parameters(self, learning_rate):
         """
 
@@ -171,11 +249,11 @@ class ConvLayer(Layer):
             parameters.
 
         """
-        param_file = open('saved_params/Conv_' + str(file_idx) + '_weights', 'w')
+        param_file = open('saved_params/Conv_' + str(file_idx) + '_weights', 'wb')
         np.save(param_file, self._filter_weights)
         param_file.close()
 
-        param_file = open('saved_params/Conv_' + str(file_idx) + '_biases', 'w')
+        param_file = open('saved_params/Conv_' + str(file_idx) + '_biases', 'wb')
         np.save(param_file, self._biases)
         param_file.close()
 
@@ -190,9 +268,9 @@ class ConvLayer(Layer):
 
         """
         param_file = open('saved_params/Conv_' + str(file_idx) + '_weights', 'rb')
-        self._filter_weights = np.load(param_file)
+        self._filter_weights = np.load(param_file).astype(self._dtype)
         param_file.close()
 
         param_file = open('saved_params/Conv_' + str(file_idx) + '_biases', 'rb')
-        self._biases = np.load(param_file)
+        self._biases = np.load(param_file).astype(self._dtype)
         param_file.close()
@@ -10,6 +10,9 @@ from conv_layer import ConvLayer
 
 class ConvLayerCUDA(ConvLayer):
 
+    # The CUDA kernels only process a single example at a time
+    supports_batch = False
+
     def __init__(self, num_filters, filter_shape, weight_scale, padding_mode=True):
         """
 
@@ -34,13 +37,17 @@ class ConvLayerCUDA(ConvLayer):
             """)
         super(ConvLayerCUDA, self).__init__(num_filters, filter_shape, weight_scale, padding_mode)
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: the state for back-propagation is always kept.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -87,13 +94,15 @@ class ConvLayerCUDA(ConvLayer):
 
         return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -194,6 +203,11 @@ class ConvLayerCUDA(ConvLayer):
     def get_output_shape(self):
         return super(ConvLayerCUDA, self).get_output_shape()
 
+    def set_dtype(self, dtype):
+        # The CUDA kernels read the parameters as doubles
+        assert np.dtype(dtype) == np.float64, "ConvLayerCUDA only supports float64"
+        super(ConvLayerCUDA, self).set_dtype(dtype)
+
     def update_parameters(self, learning_rate):
         super(ConvLayerCUDA, self).update_parameters(learning_rate)
 
@@ -31,45 +31,75 @@ class FullyConnectedLayer(Layer):
         self._weights = None
         self._d_weights = None
 
-    def forward_prop(self, input):
+        # Output and gradient arrays reused across calls, indexed by name and shape
+        self._buffers = {}
+
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
         array of double
-            The result of the fully-connected layer processing the input.
+            The result of the fully-connected layer processing the input. The same array is
+            overwritten by the next call with an input of the same shape.
 
         """
-        assert self._input_shape == input.shape, "Input does not have correct shape"
-        self._current_input = input
-        return np.dot(input, self._weights) + self._biases
+        self._is_batch(input)
+        input = input.astype(self._dtype, copy=False)
+        if training:
+            self._state(context)._current_input = input
+
+        output = self._get_buffer('output', input.shape[:-1] + self.get_output_shape(), context)
+        np.dot(input, self._weights, out=output)
+        output += self._biases
+        return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
         array of double
-            The gradient computed by this layer.
+            The gradient computed by this layer. The same array is overwritten by the next call
+            with an output gradient of the same shape.
 
         """
-        # Compute derivatives for weight matrix and bias values
-        self._d_weights += np.dot(np.resize(self._current_input, (self._input_shape[0], 1)),
-                                  np.resize(output_grad, (output_grad.shape[0], 1)).T)
-        self._d_biases += output_grad
+        output_grad = output_grad.astype(self._dtype, copy=False)
+
+        # View a single example as a batch of size 1
+        input_batch = self._state(context)._current_input.reshape(-1, self._input_shape[0])
+        output_grad_batch = output_grad.reshape(-1, self._num_nodes)
+
+        # Compute derivatives for weight matrix and bias values, summed over all examples
+        d_weights = self._get_buffer('d_weights', self._d_weights.shape, context)
+        np.dot(input_batch.T, output_grad_batch, out=d_weights)
+        self._d_weights += d_weights
+        self._d_biases += np.sum(output_grad_batch, axis=0)
 
         # Compute new gradient
-        return np.dot(output_grad, self._weights.T)
+        input_grad = self._get_buffer('input_grad', output_grad.shape[:-1] + self._input_shape,
+                                      context)
+        np.dot(output_grad, self._weights.T, out=input_grad)
+        return input_grad
 
     def set_input_shape(self, shape):
         """
@@ -83,8 +113,8 @@ class FullyConnectedLayer(Layer):
         self._input_shape = shape
         # Initialise weights as described in the __init__ method docstring
         self._weights = np.random.normal(loc=0, scale=self._weight_scale,
-                                         size=(shape[0], self._num_nodes)).astype(np.float64)
-        self._d_weights = np.zeros(self._weights.shape).astype(np.float64)
+                                         size=(shape[0], self._num_nodes)).astype(self._dtype)
+        self._d_weights = np.zeros(self._weights.shape).astype(self._dtype)
 
     def get_output_shape(self):
         """
@@ -98,6 +128,59 @@ class FullyConnectedLayer(Layer):
         shape = (self._num_nodes,)
         return shape
 
+    def set_dtype(self, dtype):
+        """
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            The floating-point type in which this layer stores its parameters and computes its
+            outputs and gradients.
+
+        """
+        super(FullyConnectedLayer, self).set_dtype(dtype)
+
+        self._biases = self._biases.astype(self._dtype)
+        self._d_biases = self._d_biases.astype(self._dtype)
+        if self._weights is not None:
+            self._weights = self._weights.astype(self._dtype)
+            self._d_weights = self._d_weights.astype(self._dtype)
+
+    def get_parameters(self):
+        """
+
+        Returns
+        -------
+        list of numpy.array
+            The parameters of this layer: the weight matrix and the biases.
+
+        """
+        return [self._weights, self._biases]
+
+    def get_derivatives(self):
+        """
+
+        Returns
+        -------
+        list of numpy.array
+            The derivatives accumulated for the parameters of this layer since the last update, in
+            the same order as get_parameters().
+
+        """
+        return [self._d_weights, self._d_biases]
+
+    def set_parameters(self, parameters):
+        """
+
+        Parameters
+        ----------
+        parameters : list of numpy.array
+            The new parameters of this layer, in the same order as get_parameters(). The arrays are
+            used directly (e.g. they may live in shared memory), not copied.
+
+        """
+        self._weights, self._biases = parameters
+
     def update_parameters(self, learning_rate):
         """
 
@@ -124,11 +207,11 @@ class FullyConnectedLayer(Layer):
             parameters.
 
         """
-        param_file = open('saved_params/FC_' + str(file_idx) + '_weights', 'w')
+        param_file = open('saved_params/FC_' + str(file_idx) + '_weights', 'wb')
         np.save(param_file, self._weights)
         param_file.close()
 
-        param_file = open('saved_params/FC_' + str(file_idx) + '_biases', 'w')
+        param_file = open('saved_params/FC_' + str(file_idx) + '_biases', 'wb')
         np.save(param_file, self._biases)
         param_file.close()
 
@@ -143,9 +226,9 @@ class FullyConnectedLayer(Layer):
 
         """
         param_file = open('saved_params/FC_' + str(file_idx) + '_weights', 'rb')
-        self._weights = np.load(param_file)
+        self._weights = np.load(param_file).astype(self._dtype)
         param_file.close()
 
         param_file = open('saved_params/FC_' + str(file_idx) + '_biases', 'rb')
-        self._biases = np.load(param_file)
+        self._biases = np.load(param_file).astype(self._dtype)
         param_file.close()
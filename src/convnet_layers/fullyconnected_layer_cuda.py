@@ -10,6 +10,9 @@ from fullyconnected_layer import FullyConnectedLayer
 
 class FullyConnectedLayerCUDA(FullyConnectedLayer):
 
+    # The CUDA kernels only process a single example at a time
+    supports_batch = False
+
     def __init__(self, num_nodes, weight_scale):
         """
 
@@ -30,13 +33,17 @@ class FullyConnectedLayerCUDA(FullyConnectedLayer):
             """)
         super(FullyConnectedLayerCUDA, self).__init__(num_nodes, weight_scale)
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: the state for back-propagation is always kept.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -74,13 +81,15 @@ class FullyConnectedLayerCUDA(FullyConnectedLayer):
 
         return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -128,6 +137,11 @@ class FullyConnectedLayerCUDA(FullyConnectedLayer):
     def get_output_shape(self):
         return super(FullyConnectedLayerCUDA, self).get_output_shape()
 
+    def set_dtype(self, dtype):
+        # The CUDA kernels read the parameters as doubles
+        assert np.dtype(dtype) == np.float64, "FullyConnectedLayerCUDA only supports float64"
+        super(FullyConnectedLayerCUDA, self).set_dtype(dtype)
+
     def update_parameters(self, learning_rate):
         super(FullyConnectedLayerCUDA, self).update_parameters(learning_rate)
 
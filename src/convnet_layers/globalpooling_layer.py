@@ -10,14 +10,22 @@ class GlobalPoolingLayer(Layer):
         self._input_shape = None
         self._current_input = None
         self._max_activation_indices = None
+        self._l2_values = None
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
@@ -25,28 +33,48 @@ class GlobalPoolingLayer(Layer):
             The result of the global pooling layer processing the input.
 
         """
-        assert self._input_shape == input.shape, "Input does not have correct shape"
-        self._current_input = input
-
-        output = np.empty(self.get_output_shape())
-
-        for f in range(self._input_shape[0]):
-            # Average pooling
-            output[f] = np.mean(input[f])
-            # Max pooling
-            output[self._input_shape[0] + f] = np.max(input[f])
-            self._max_activation_indices[f] = np.argmax(input[f])
-            # L2-norm pooling
-            output[2 * self._input_shape[0] + f] = np.sqrt(np.sum(input[f] ** 2))
-        return output
-
-    def back_prop(self, output_grad):
+        batch_mode = self._is_batch(input)
+        if not batch_mode:
+            # Process a single example as a batch of size 1
+            input = input[np.newaxis]
+        state = self._state(context)
+        if training:
+            state._current_input = input
+
+        num_filters = self._input_shape[0]
+        output = np.empty((input.shape[0],) + self.get_output_shape(), dtype=self._dtype)
+
+        # Pool over the last axis for all filters (and examples) at once
+        # Average pooling
+        np.mean(input, axis=2, out=output[:, 0:num_filters])
+        # Max pooling
+        if training:
+            state._max_activation_indices = np.argmax(input, axis=2)
+            output[:, num_filters:2 * num_filters] = \
+                np.take_along_axis(input, state._max_activation_indices[..., np.newaxis],
+                                   axis=2)[..., 0]
+        else:
+            np.amax(input, axis=2, out=output[:, num_filters:2 * num_filters])
+        # L2-norm pooling, keeping the norms for back propagation
+        l2_values = np.sqrt(np.einsum('nft,nft->nf', input, input))
+        output[:, 2 * num_filters:] = l2_values
+        if training:
+            state._l2_values = l2_values
+
+        if batch_mode:
+            return output
+        else:
+            return output[0]
+
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
@@ -54,26 +82,37 @@ class GlobalPoolingLayer(Layer):
             The gradient computed by this layer.
 
         """
+        batch_mode = output_grad.ndim == 2
+        state = self._state(context)
+        if not batch_mode:
+            output_grad = output_grad[np.newaxis]
+
         # Separate the three types of gradient values to use for computing the new gradient
-        mean_output_grad = output_grad[0:self._input_shape[0]]
-        max_output_grad = output_grad[self._input_shape[0]:2 * self._input_shape[0]]
-        l2_output_grad = output_grad[2 * self._input_shape[0]:]
-
-        input_grad = np.empty(self._input_shape, dtype=np.float64)
-        range_f = self._input_shape[0]
-        for f in range(range_f):
-            # Average grad
-            input_grad[f] = mean_output_grad[f] / self._input_shape[1]
-            # Send the max gradient value to the location from where the maximum value was
-            # extracted during forward propagation
-            input_grad[f, self._max_activation_indices[f]] += max_output_grad[f]
-            # L2-norm grad
-            sqr_root = np.sqrt(np.sum(self._current_input[f] ** 2))
-            # Avoid producing exploding values, if square root is very small
-            if sqr_root >= 1e-5:
-                input_grad[f] += self._current_input[f] / sqr_root * l2_output_grad[f]
-
-        return input_grad
+        mean_output_grad = output_grad[:, 0:self._input_shape[0]]
+        max_output_grad = output_grad[:, self._input_shape[0]:2 * self._input_shape[0]]
+        l2_output_grad = output_grad[:, 2 * self._input_shape[0]:]
+
+        # Average grad, spread evenly over each row
+        input_grad = np.empty((output_grad.shape[0],) + self._input_shape, dtype=self._dtype)
+        input_grad[...] = mean_output_grad[..., np.newaxis] / self._input_shape[1]
+
+        # L2-norm grad
+        # Avoid producing exploding values, if square root is very small
+        valid = state._l2_values >= 1e-5
+        l2_scale = np.where(valid, l2_output_grad, 0) / np.where(valid, state._l2_values, 1)
+        input_grad += state._current_input * l2_scale[..., np.newaxis]
+
+        # Send the max gradient value to the location from where the maximum value was extracted
+        # during forward propagation
+        max_indices = state._max_activation_indices[..., np.newaxis]
+        np.put_along_axis(input_grad, max_indices,
+                          np.take_along_axis(input_grad, max_indices, axis=2) +
+                          max_output_grad[..., np.newaxis], axis=2)
+
+        if batch_mode:
+            return input_grad
+        else:
+            return input_grad[0]
 
     def set_input_shape(self, shape):
         """
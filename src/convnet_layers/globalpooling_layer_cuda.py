@@ -10,6 +10,9 @@ from globalpooling_layer import GlobalPoolingLayer
 
 class GlobalPoolingLayerCUDA(GlobalPoolingLayer):
 
+    # The CUDA kernels only process a single example at a time
+    supports_batch = False
+
     def __init__(self):
         mod = SourceModule("""
             __global__ void multiply_them(float *dest, float *a, float *b) {
@@ -20,13 +23,17 @@ class GlobalPoolingLayerCUDA(GlobalPoolingLayer):
         self._l2_values = None
         super(GlobalPoolingLayerCUDA, self).__init__()
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: the state for back-propagation is always kept.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -83,13 +90,15 @@ class GlobalPoolingLayerCUDA(GlobalPoolingLayer):
 
         return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -1,12 +1,31 @@
+import numpy as np
+
+
 class Layer(object):
 
-    def forward_prop(self, input):
+    # The floating-point type of the parameters, outputs and gradients of the layer, unless it is
+    # changed with set_dtype()
+    _dtype = np.dtype(np.float64)
+
+    # Whether forward_prop() and back_prop() accept batches of examples stacked along the first
+    # axis, besides single examples
+    supports_batch = True
+
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
-            The input for the layer.
+            The input for the layer: either a single example or a batch of examples stacked along
+            the first axis.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
@@ -16,13 +35,16 @@ class Layer(object):
         """
         raise NotImplementedError()
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
-            The incoming gradient from the next layer of the network.
+            The incoming gradient from the next layer of the network (for a batch, stacked along the
+            first axis in the same order as the forward_prop input).
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
@@ -53,3 +75,127 @@ class Layer(object):
 
         """
         raise NotImplementedError()
+
+    def set_dtype(self, dtype):
+        """
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            The floating-point type in which this layer stores its parameters and computes its
+            outputs and gradients.
+
+        """
+        self._dtype = np.dtype(dtype)
+
+    def _is_batch(self, input):
+        """
+
+        Parameters
+        ----------
+        input : array of double
+            An input for the layer.
+
+        Returns
+        -------
+        bool
+            Whether the input is a batch of examples stacked along the first axis (shape
+            (N,) + input shape), rather than a single example.
+
+        """
+        if input.shape == self._input_shape:
+            return False
+
+        assert input.shape[1:] == self._input_shape, "Input does not have correct shape"
+        return True
+
+    def _state(self, context):
+        """
+
+        Parameters
+        ----------
+        context : ForwardContext
+            The context of the current call, or None.
+
+        Returns
+        -------
+        object
+            The object on which the per-call state of this layer is stored: the layer itself, or
+            the state of the layer in the given context.
+
+        """
+        if context is None:
+            return self
+        return context.state(self)
+
+    def _get_buffer(self, name, shape, context=None):
+        """
+
+        Parameters
+        ----------
+        name : str
+            The purpose of the buffer.
+        shape : tuple
+            The shape of the buffer.
+        context : ForwardContext
+            The context of the current call, or None.
+
+        Returns
+        -------
+        array of double
+            An uninitialised array of the given shape and of the dtype of the layer, kept in the
+            _buffers dictionary of the layer (or of its state in the context) and only allocated
+            on the first request.
+
+        """
+        buffers = self._state(context)._buffers
+        buffer = buffers.get((name, shape))
+        if buffer is None or buffer.dtype != self._dtype:
+            buffer = np.empty(shape, dtype=self._dtype)
+            buffers[(name, shape)] = buffer
+        return buffer
+
+
+class ForwardContext(object):
+
+    def __init__(self):
+        """
+
+        Holds the state which layers keep between forward and back-propagation (their inputs,
+        the positions of maxima, etc.) and their scratch arrays, for the calls which are given
+        this context. Only the parameters are then read from the layers, so several threads can
+        run forward passes through the same layers at the same time, each with its own context.
+        A context can be reused by successive calls from the same thread.
+
+        """
+        self._states = {}
+
+    def state(self, layer):
+        """
+
+        Parameters
+        ----------
+        layer : Layer
+            A layer which uses this context.
+
+        Returns
+        -------
+        _LayerState
+            The state of the layer in this context, created on first use.
+
+        """
+        if id(layer) not in self._states:
+            self._states[id(layer)] = _LayerState()
+        return self._states[id(layer)]
+
+
+class _LayerState(object):
+
+    def __init__(self):
+        """
+
+        The per-call attributes of a layer (e.g. _current_input), set and read by the layer in
+        place of its own.
+
+        """
+        self._buffers = {}
@@ -2,32 +2,57 @@ import numpy as np
 import time
 
 from layer import Layer
+from util.im2col import pooling_windows
 
 
 class MaxPoolingLayer(Layer):
 
-    def __init__(self, filter_shape):
+    def __init__(self, filter_shape, stride=None, padding=(0, 0)):
         """
 
         Parameters
         ----------
         filter_shape : tuple
-            The shape of the pooling filter (area of disjoint regions over which max pooling will
-                                             be done).
+            The shape of the pooling filter (area of the regions over which max pooling will be
+                                             done).
+        stride : tuple
+            The vertical and horizontal distance between successive pooling regions. By default,
+            it is equal to the filter shape, so that the regions are disjoint; a smaller stride
+            makes them overlap.
+        padding : tuple
+            The number of rows and columns of padding added at both ends of each axis of the input.
+            Padding never contributes to the maximum of a region.
 
         """
+        if stride is None:
+            stride = filter_shape
+        assert padding[0] < filter_shape[0] and padding[1] < filter_shape[1],\
+            "Padding must be smaller than the filter shape in MaxPoolingLayer"
+
         self._filter_shape = filter_shape
+        self._stride = stride
+        self._padding = padding
         self._input_shape = None
         self._current_input = None
         self._max_activation_indices = None
 
-    def forward_prop(self, input):
+        # Scratch arrays reused across calls, indexed by name and shape
+        self._buffers = {}
+
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Whether the input is processed during training, in which case the layer keeps what it
+            needs for back-propagation. Otherwise, this bookkeeping is skipped.
+        context : ForwardContext
+            If given, the state kept for back-propagation and the scratch arrays are stored in this
+            context instead of the layer, so that concurrent calls with different contexts can
+            share the layer.
 
         Returns
         -------
@@ -35,57 +60,72 @@ class MaxPoolingLayer(Layer):
             The result of the max pooling layer processing the input.
 
         """
-        assert self._input_shape == input.shape, "Input does not have correct shape"
-        self._current_input = input
-
-        if (len(self.get_output_shape()) == 1):
-            output = np.empty((1, self.get_output_shape()[0]))
-        else:
-            output = np.empty(self.get_output_shape())
+        batch_mode = self._is_batch(input)
+        if not batch_mode:
+            # Process a single example as a batch of size 1
+            input = input[np.newaxis]
+        state = self._state(context)
+        if training:
+            state._current_input = input
 
-        self._max_activation_indices = np.empty(self.get_output_shape() + (2,))
-
-        filter_h = self._filter_shape[0]
-        filter_w = self._filter_shape[1]
         input_h = self._input_shape[0]
         input_w = self._input_shape[1]
-
-        range_i = input_h/filter_h
-        range_j = input_w/filter_w
-
-        for i in range(range_i):
-            for j in range(range_j):
-                current_h = i * filter_h
-                current_w = j * filter_w
-
-                max_val = -np.inf
-                h_max = 0
-                w_max = 0
-                for h in range(current_h, current_h + filter_h):
-                    for w in range(current_w, current_w + filter_w):
-                        # Determine maximum value in the current pooling region
-                        if input[h, w] > max_val:
-                            # Record indices of the maximum
-                            h_max = h
-                            w_max = w
-                            max_val = input[h, w]
-                output[i, j] = max_val
-                # Save indices for the current region
-                self._max_activation_indices[i, j, 0] = h_max
-                self._max_activation_indices[i, j, 1] = w_max
-
-        if output.shape[0] == 1:
-            return output[0]
+        pad_h = self._padding[0]
+        pad_w = self._padding[1]
+        batch_size = input.shape[0]
+
+        if pad_h > 0 or pad_w > 0:
+            # Pad with -inf, so that the maximum of a region is always taken from the input
+            padded_shape = (batch_size, input_h + 2 * pad_h, input_w + 2 * pad_w)
+            if training:
+                padded_input = np.empty(padded_shape, dtype=self._dtype)
+            else:
+                # Reuse the same scratch array for every inference call
+                padded_input = self._get_buffer('padded_input', padded_shape, context)
+            padded_input.fill(-np.inf)
+            padded_input[:, pad_h:pad_h + input_h, pad_w:pad_w + input_w] = input
+        else:
+            padded_input = input
+
+        # Gather the elements of each pooling region along the last axis:
+        # (N, H, W) -> (N, range_i, range_j, fh, fw) -> (N, range_i, range_j, fh * fw)
+        windows = pooling_windows(padded_input, self._filter_shape, self._stride)
+        range_i = windows.shape[1]
+        range_j = windows.shape[2]
+        regions = windows.reshape(batch_size, range_i, range_j, -1)
+
+        if training:
+            # Determine the position of the maximum within each pooling region
+            region_max_indices = np.argmax(regions, axis=3)
+            output = np.take_along_axis(regions, region_max_indices[..., np.newaxis],
+                                        axis=3)[..., 0]
+
+            # Save the flat indices of the maxima within the (batch of) unpadded input(s)
+            h = np.arange(range_i)[:, np.newaxis] * self._stride[0] - pad_h + \
+                region_max_indices / self._filter_shape[1]
+            w = np.arange(range_j) * self._stride[1] - pad_w + \
+                region_max_indices % self._filter_shape[1]
+            state._max_activation_indices = (np.arange(batch_size)[:, np.newaxis, np.newaxis] *
+                                             input_h + h) * input_w + w
         else:
+            output = np.amax(regions, axis=3)
+
+        # Drop the row axis if the output has a single row, then the batch axis if not batched
+        output = output.reshape((batch_size,) + self.get_output_shape())
+        if batch_mode:
             return output
+        else:
+            return output[0]
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            The context given to the matching forward_prop() call, if any.
 
         Returns
         -------
@@ -93,17 +133,27 @@ class MaxPoolingLayer(Layer):
             The gradient computed by this layer.
 
         """
-        input_grad = np.zeros(self._input_shape)
-
-        for i in range(output_grad.shape[0]):
-            for j in range(output_grad.shape[1]):
-                h = self._max_activation_indices[i, j, 0]
-                w = self._max_activation_indices[i, j, 1]
-                # Send the current gradient to the input location from where the maximum value was
-                # obtained
-                input_grad[h, w] = output_grad[i, j]
-
-        return input_grad
+        batch_mode = output_grad.ndim > len(self.get_output_shape())
+        max_activation_indices = self._state(context)._max_activation_indices
+        batch_size = max_activation_indices.shape[0]
+        input_grad_shape = (batch_size,) + self._input_shape
+
+        # Send each gradient value to the input location from where the maximum value was obtained
+        if self._stride[0] >= self._filter_shape[0] and self._stride[1] >= self._filter_shape[1]:
+            # Disjoint regions: each input location receives at most one gradient value
+            input_grad = np.zeros(input_grad_shape, dtype=self._dtype)
+            input_grad.ravel()[max_activation_indices.ravel()] = output_grad.ravel()
+        else:
+            # Overlapping regions: sum the gradient values of all regions sharing the same maximum
+            input_grad = np.bincount(max_activation_indices.ravel(),
+                                     weights=output_grad.ravel(),
+                                     minlength=np.prod(input_grad_shape)).\
+                reshape(input_grad_shape).astype(self._dtype, copy=False)
+
+        if batch_mode:
+            return input_grad
+        else:
+            return input_grad[0]
 
     def set_input_shape(self, shape):
         """
@@ -125,14 +175,18 @@ class MaxPoolingLayer(Layer):
             The output shape of this layer.
 
         """
-        assert self._input_shape[0] % self._filter_shape[0] == 0 and \
-               self._input_shape[1] % self._filter_shape[1] == 0,\
-            "Input shape is not a multiple of filter shape in MaxPoolingLayer"
+        padded_h = self._input_shape[0] + 2 * self._padding[0]
+        padded_w = self._input_shape[1] + 2 * self._padding[1]
+        assert padded_h >= self._filter_shape[0] and padded_w >= self._filter_shape[1],\
+            "Input shape is smaller than filter shape in MaxPoolingLayer"
+
+        # Any rows or columns beyond the last complete pooling region are ignored
+        output_h = (padded_h - self._filter_shape[0]) / self._stride[0] + 1
+        output_w = (padded_w - self._filter_shape[1]) / self._stride[1] + 1
 
-        if self._input_shape[0] / self._filter_shape[0] == 1:
-            shape = (self._input_shape[1] / self._filter_shape[1],)
+        if output_h == 1:
+            shape = (output_w,)
         else:
-            shape = (self._input_shape[0] / self._filter_shape[0],
-                     self._input_shape[1] / self._filter_shape[1])
+            shape = (output_h, output_w)
 
         return shape
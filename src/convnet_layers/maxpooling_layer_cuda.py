@@ -10,6 +10,9 @@ from maxpooling_layer import MaxPoolingLayer
 
 class MaxPoolingLayerCUDA(MaxPoolingLayer):
 
+    # The CUDA kernels only process a single example at a time
+    supports_batch = False
+
     def __init__(self, filter_shape):
         """
 
@@ -28,13 +31,17 @@ class MaxPoolingLayerCUDA(MaxPoolingLayer):
         """)
         super(MaxPoolingLayerCUDA, self).__init__(filter_shape)
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: the state for back-propagation is always kept.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
@@ -130,13 +137,15 @@ class MaxPoolingLayerCUDA(MaxPoolingLayer):
         else:
             return output
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         """
 
         Parameters
         ----------
         output_grad : array of double
             The incoming gradient from the next layer of the network.
+        context : ForwardContext
+            Unused: the state is always kept by the layer, so concurrent calls are not supported.
 
         Returns
         -------
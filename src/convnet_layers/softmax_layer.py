@@ -8,13 +8,17 @@ class SoftmaxLayer(Layer):
     def __init__(self):
         self._num_nodes = None
 
-    def forward_prop(self, input):
+    def forward_prop(self, input, training=True, context=None):
         """
 
         Parameters
         ----------
         input : array of double
             The input for the layer.
+        training : bool
+            Unused: this layer keeps no state for back-propagation (see initial_gradient()).
+        context : ForwardContext
+            Unused: this layer keeps no state.
 
         Returns
         -------
@@ -22,11 +26,12 @@ class SoftmaxLayer(Layer):
             The result of the layer processing the input, representing the output of the network.
 
         """
-        input -= np.amax(input)
+        # Normalise each example (the last axis) separately, so that batches are also supported
+        input -= np.amax(input, axis=-1, keepdims=True)
         exp = np.exp(input)
-        return exp / np.sum(exp)
+        return exp / np.sum(exp, axis=-1, keepdims=True)
 
-    def back_prop(self, output_grad):
+    def back_prop(self, output_grad, context=None):
         raise NotImplementedError("Output layer ---> NO back-propagation; use initial_gradient()" +
                                   " instead")
 
@@ -65,10 +70,12 @@ class SoftmaxLayer(Layer):
         Returns
         -------
         double
-            The result of the cross-entropy function applied to the given distributions.
+            The result of the cross-entropy function applied to the given distributions (summed over
+            all examples, for a batch).
 
         """
-        return -np.sum(true_output * np.log(predicted_output / np.sum(predicted_output)))
+        return -np.sum(true_output * np.log(predicted_output /
+                                            np.sum(predicted_output, axis=-1, keepdims=True)))
 
     def set_input_shape(self, shape):
         """
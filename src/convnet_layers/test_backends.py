@@ -0,0 +1,65 @@
+import numpy as np
+import os
+import sys
+import unittest
+
+import backends
+from conv_layer import ConvLayer
+from maxpooling_layer import MaxPoolingLayer
+from softmax_layer import SoftmaxLayer
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_cpu(self):
+        self.assertIs(backends.get_layer_class('conv', 'cpu'), ConvLayer)
+
+        layer = backends.create_layer('max_pooling', (1, 4), backend='cpu')
+        self.assertIs(type(layer), MaxPoolingLayer)
+
+    def test_auto(self):
+        layer_class = backends.get_layer_class('conv', 'auto')
+        if backends.cuda_available():
+            self.assertTrue(issubclass(layer_class, ConvLayer))
+        else:
+            # The CUDA layers are not imported without a GPU
+            self.assertIs(layer_class, ConvLayer)
+            self.assertNotIn('conv_layer_cuda', sys.modules)
+
+    def test_auto_unsupported(self):
+        cuda_available = backends._cuda_available
+        # Even with a GPU, the CPU layers are used, since the CUDA layers neither process batches
+        # nor float32
+        backends._cuda_available = True
+        try:
+            self.assertIs(backends.get_layer_class('conv', 'auto', batched=True), ConvLayer)
+            layer = backends.create_layer('max_pooling', (1, 4), backend='auto', dtype=np.float32)
+            self.assertIs(type(layer), MaxPoolingLayer)
+        finally:
+            backends._cuda_available = cuda_available
+
+    def test_opt_out(self):
+        cuda_available = backends._cuda_available
+        backend = os.environ.get('CONVNET_BACKEND')
+        # The environment variable takes precedence over a GPU found earlier
+        backends._cuda_available = True
+        os.environ['CONVNET_BACKEND'] = 'cpu'
+        try:
+            self.assertFalse(backends.cuda_available())
+            self.assertIs(backends.get_layer_class('conv', 'auto'), ConvLayer)
+        finally:
+            backends._cuda_available = cuda_available
+            if backend is None:
+                del os.environ['CONVNET_BACKEND']
+            else:
+                os.environ['CONVNET_BACKEND'] = backend
+
+    def test_cpu_only_layer(self):
+        self.assertIs(backends.get_layer_class('softmax', 'cuda'), SoftmaxLayer)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, backends.get_layer_class, 'dropout')
+        self.assertRaises(ValueError, backends.get_layer_class, 'conv', 'opencl')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,24 @@ class TestConvLayer(unittest.TestCase):
         output = self.layer.forward_prop(self.input)
         numpy.testing.assert_array_equal(output, expected_output)
 
+    def test_forward_prop_padded_random(self):
+        layer = ConvLayer(4, (3, 2), 1, padding_mode=True)
+        layer.set_input_shape((3, 7))
+        layer._biases = np.random.randn(4)
+        input = np.random.randn(3, 7)
+
+        # Compute the expected output window by window
+        padded_input = np.zeros((3, 9))
+        padded_input[:, 1:8] = input
+        expected_output = np.empty((4, 8))
+        for f in range(4):
+            for w in range(8):
+                expected_output[f, w] = np.sum(layer._filter_weights[f] *
+                                               padded_input[:, w:w + 2]) + layer._biases[f]
+
+        output = layer.forward_prop(input)
+        numpy.testing.assert_array_almost_equal(output, expected_output)
+
     def test_back_prop(self):
         self.layer.forward_prop(self.input)
 
@@ -33,6 +51,79 @@ class TestConvLayer(unittest.TestCase):
         in_grad = self.layer.back_prop(out_grad)
         numpy.testing.assert_array_equal(in_grad, expected_in_grad)
 
+    def test_back_prop_padded_random(self):
+        layer = ConvLayer(4, (3, 2), 1, padding_mode=True)
+        layer.set_input_shape((3, 7))
+        input = np.random.randn(3, 7)
+        out_grad = np.random.randn(4, 8)
+
+        # Compute the expected gradients window by window
+        padded_input = np.zeros((3, 9))
+        padded_input[:, 1:8] = input
+        expected_padded_in_grad = np.zeros((3, 9))
+        expected_d_filter_weights = np.zeros((4, 3, 2))
+        for w in range(8):
+            for f in range(4):
+                expected_padded_in_grad[:, w:w + 2] += out_grad[f, w] * layer._filter_weights[f]
+                expected_d_filter_weights[f] += out_grad[f, w] * padded_input[:, w:w + 2]
+
+        layer.forward_prop(input)
+        in_grad = layer.back_prop(out_grad)
+        numpy.testing.assert_array_almost_equal(in_grad, expected_padded_in_grad[:, 1:8])
+        numpy.testing.assert_array_almost_equal(layer._d_filter_weights, expected_d_filter_weights)
+        numpy.testing.assert_array_almost_equal(layer._d_biases, np.sum(out_grad, axis=1))
+
+    def test_batch(self):
+        batch_input = np.array([self.input, 2 * self.input, -self.input])
+        out_grad = np.random.randn(3, 2, 6)
+
+        # Process each example on its own first
+        expected_output = np.array([self.layer.forward_prop(input) for input in batch_input])
+        expected_in_grad = np.empty(batch_input.shape)
+        for n in range(3):
+            self.layer.forward_prop(batch_input[n])
+            expected_in_grad[n] = self.layer.back_prop(out_grad[n])
+        expected_d_filter_weights = self.layer._d_filter_weights.copy()
+        expected_d_biases = self.layer._d_biases.copy()
+        self.layer._d_filter_weights[...] = 0
+        self.layer._d_biases[...] = 0
+
+        output = self.layer.forward_prop(batch_input)
+        numpy.testing.assert_array_almost_equal(output, expected_output)
+
+        in_grad = self.layer.back_prop(out_grad)
+        numpy.testing.assert_array_almost_equal(in_grad, expected_in_grad)
+        numpy.testing.assert_array_almost_equal(self.layer._d_filter_weights,
+                                                expected_d_filter_weights)
+        numpy.testing.assert_array_almost_equal(self.layer._d_biases, expected_d_biases)
+
+    def test_forward_prop_inference(self):
+        layer = ConvLayer(4, (3, 2), 1, padding_mode=True)
+        layer.set_input_shape((3, 7))
+        input = np.random.randn(5, 3, 7)
+
+        expected_output = layer.forward_prop(input)
+        layer._current_padded_input = None
+
+        # The padding of the reused scratch array must stay zero across calls
+        for i in range(2):
+            output = layer.forward_prop(input, training=False)
+            numpy.testing.assert_array_almost_equal(output, expected_output)
+        self.assertIsNone(layer._current_padded_input)
+
+    def test_float32(self):
+        self.layer.set_dtype(np.float32)
+        self.assertEqual(self.layer._filter_weights.dtype, np.float32)
+
+        output = self.layer.forward_prop(self.input.astype(np.float32))
+        self.assertEqual(output.dtype, np.float32)
+        numpy.testing.assert_array_equal(output, np.array([[18, 18, 18, 18, 18, 24],
+                                                           [9, 9, 9, 9, 9, 12]]))
+
+        in_grad = self.layer.back_prop(np.ones((2, 6), dtype=np.float32))
+        self.assertEqual(in_grad.dtype, np.float32)
+        self.assertEqual(self.layer._d_filter_weights.dtype, np.float32)
+
     def test_get_output_shape(self):
         self.assertEqual(self.layer.get_output_shape(), (2, 6))
 
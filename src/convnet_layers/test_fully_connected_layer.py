@@ -3,6 +3,7 @@ import numpy.testing
 import unittest
 
 from fullyconnected_layer import FullyConnectedLayer
+from layer import ForwardContext
 
 
 class TestFullyConnectedLayer(unittest.TestCase):
@@ -32,6 +33,64 @@ class TestFullyConnectedLayer(unittest.TestCase):
         in_grad = self.layer.back_prop(out_grad)
         numpy.testing.assert_array_equal(in_grad, expected_in_grad)
 
+    def test_batch(self):
+        input = np.array([[-3, 14, -5, 6],
+                          [1, 1, 1, 1]], dtype=np.float64)
+        expected_output = np.array([[12, 6, 28],
+                                    [4, 2, 0]], dtype=np.float64)
+
+        output = self.layer.forward_prop(input)
+        numpy.testing.assert_array_equal(output, expected_output)
+
+        out_grad = np.array([[1, 1, 1],
+                             [1, 0, 0]], dtype=np.float64)
+        expected_in_grad = np.array([[0.5, 2.5, 0.5, 2.5],
+                                     [1, 1, 1, 1]], dtype=np.float64)
+
+        in_grad = self.layer.back_prop(out_grad)
+        numpy.testing.assert_array_equal(in_grad, expected_in_grad)
+        # Derivatives are summed over the examples in the batch
+        numpy.testing.assert_array_equal(self.layer._d_weights,
+                                         np.array([[-2, -3, -3],
+                                                   [15, 14, 14],
+                                                   [-4, -5, -5],
+                                                   [7, 6, 6]], dtype=np.float64))
+        numpy.testing.assert_array_equal(self.layer._d_biases, np.array([2, 1, 1]))
+
+    def test_context(self):
+        first_context = ForwardContext()
+        second_context = ForwardContext()
+
+        first_output = self.layer.forward_prop(np.array([-3, 14, -5, 6], dtype=np.float64),
+                                               context=first_context)
+        second_output = self.layer.forward_prop(np.array([1, 1, 1, 1], dtype=np.float64),
+                                                context=second_context)
+        # Each context has its own output array, and the layer keeps no state
+        numpy.testing.assert_array_equal(first_output, np.array([12, 6, 28]))
+        numpy.testing.assert_array_equal(second_output, np.array([4, 2, 0]))
+        self.assertIsNone(self.layer._current_input)
+
+        in_grad = self.layer.back_prop(np.array([1, 0, 0], dtype=np.float64),
+                                       context=second_context)
+        numpy.testing.assert_array_equal(in_grad, np.array([1, 1, 1, 1]))
+        numpy.testing.assert_array_equal(self.layer._d_biases, np.array([1, 0, 0]))
+
+    def test_float32(self):
+        self.layer.set_dtype(np.float32)
+
+        input = np.array([[-3, 14, -5, 6],
+                          [1, 1, 1, 1]], dtype=np.float32)
+        output = self.layer.forward_prop(input)
+        self.assertEqual(output.dtype, np.float32)
+        numpy.testing.assert_array_equal(output, np.array([[12, 6, 28],
+                                                           [4, 2, 0]]))
+
+        in_grad = self.layer.back_prop(np.ones((2, 3), dtype=np.float32))
+        self.assertEqual(in_grad.dtype, np.float32)
+        self.assertEqual(self.layer._d_weights.dtype, np.float32)
+        numpy.testing.assert_array_equal(in_grad, np.array([[0.5, 2.5, 0.5, 2.5],
+                                                            [0.5, 2.5, 0.5, 2.5]]))
+
     def test_get_output_shape(self):
         self.assertEqual(self.layer.get_output_shape(), (3, ))
 
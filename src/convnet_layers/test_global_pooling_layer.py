@@ -46,6 +46,33 @@ class TestGlobalPoolingLayer(unittest.TestCase):
         in_grad = self.layer.back_prop(out_grad)
         numpy.testing.assert_array_almost_equal(in_grad, expected_in_grad)
 
+    def test_batch(self):
+        batch_input = np.array([self.input, [[0.000001, 0.000001, 0.000001, 0.000001],
+                                             [1, 2, 3, 4]]], dtype=np.float64)
+        out_grad = np.array([[0.1, 0.2, 0.3, 0.2, 0.1, 0.2],
+                             [0.3, 0.1, 0.2, 0.1, 0.3, 0.2]], dtype=np.float64)
+
+        # Process each example on its own first
+        expected_output = np.empty((2, 6))
+        expected_in_grad = np.empty((2, 2, 4))
+        for n in range(2):
+            expected_output[n] = self.layer.forward_prop(batch_input[n])
+            expected_in_grad[n] = self.layer.back_prop(out_grad[n])
+
+        output = self.layer.forward_prop(batch_input)
+        numpy.testing.assert_array_almost_equal(output, expected_output)
+
+        in_grad = self.layer.back_prop(out_grad)
+        numpy.testing.assert_array_almost_equal(in_grad, expected_in_grad)
+
+    def test_forward_prop_inference(self):
+        expected_output = np.array([2, -20, 7, 50, 10, 100], dtype=np.float64)
+
+        output = self.layer.forward_prop(self.input, training=False)
+        numpy.testing.assert_array_equal(output, expected_output)
+        self.assertIsNone(self.layer._current_input)
+        self.assertIsNone(self.layer._l2_values)
+
     def test_get_output_shape(self):
         self.assertEqual(self.layer.get_output_shape(), (6, ))
 
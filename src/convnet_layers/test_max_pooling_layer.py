@@ -2,6 +2,7 @@ import numpy as np
 import numpy.testing
 import unittest
 
+from layer import ForwardContext
 from maxpooling_layer import MaxPoolingLayer
 
 
@@ -49,10 +50,108 @@ class TestMaxPoolingLayer(unittest.TestCase):
         in_grad = self.layer.back_prop(out_grad)
         numpy.testing.assert_array_equal(in_grad, expected_in_grad)
 
+    def test_batch(self):
+        self.layer.set_input_shape((2, 6))
+
+        input = np.array([[[1, 2, 3, 4, 6, 5],
+                           [-1, -2, -3, -4, -6, -5]],
+                          [[2, 1, 4, 3, 5, 6],
+                           [-2, -1, -4, -3, -5, -6]]], dtype=np.float64)
+        expected_output = np.array([[[2, 4, 6],
+                                     [-1, -3, -5]],
+                                    [[2, 4, 6],
+                                     [-1, -3, -5]]], dtype=np.float64)
+
+        output = self.layer.forward_prop(input)
+        numpy.testing.assert_array_equal(output, expected_output)
+
+        out_grad = np.array([[[1, 2, 3],
+                              [4, 5, 6]],
+                             [[7, 8, 9],
+                              [10, 11, 12]]], dtype=np.float64)
+        expected_in_grad = np.array([[[0, 1, 0, 2, 3, 0],
+                                      [4, 0, 5, 0, 0, 6]],
+                                     [[7, 0, 8, 0, 0, 9],
+                                      [0, 10, 0, 11, 12, 0]]], dtype=np.float64)
+
+        in_grad = self.layer.back_prop(out_grad)
+        numpy.testing.assert_array_equal(in_grad, expected_in_grad)
+
+    def test_overlapping_regions(self):
+        layer = MaxPoolingLayer((1, 4), stride=(1, 2))
+        layer.set_input_shape((2, 9))
+
+        input = np.array([[1, 2, 9, 3, 4, 5, 6, 7, 8],
+                          [8, 7, 6, 5, 4, 3, 2, 1, 0]], dtype=np.float64)
+        expected_output = np.array([[9, 9, 7],
+                                    [8, 6, 4]], dtype=np.float64)
+
+        output = layer.forward_prop(input)
+        numpy.testing.assert_array_equal(output, expected_output)
+
+        out_grad = np.array([[1, 2, 3],
+                             [4, 5, 6]], dtype=np.float64)
+        # The maximum 9 is shared by the first two regions, so it receives both their gradients
+        expected_in_grad = np.array([[0, 0, 3, 0, 0, 0, 0, 3, 0],
+                                     [4, 0, 5, 0, 6, 0, 0, 0, 0]], dtype=np.float64)
+
+        in_grad = layer.back_prop(out_grad)
+        numpy.testing.assert_array_equal(in_grad, expected_in_grad)
+
+    def test_padding(self):
+        layer = MaxPoolingLayer((1, 3), stride=(1, 2), padding=(0, 1))
+        layer.set_input_shape((1, 6))
+
+        input = np.array([[-5, -1, -2, -3, -4, -6]], dtype=np.float64)
+        expected_output = np.array([-1, -1, -3], dtype=np.float64)
+
+        output = layer.forward_prop(input)
+        numpy.testing.assert_array_equal(output, expected_output)
+
+        out_grad = np.array([1, 2, 3], dtype=np.float64)
+        expected_in_grad = np.array([[0, 3, 0, 3, 0, 0]], dtype=np.float64)
+
+        in_grad = layer.back_prop(out_grad)
+        numpy.testing.assert_array_equal(in_grad, expected_in_grad)
+
+    def test_forward_prop_inference(self):
+        layer = MaxPoolingLayer((1, 3), stride=(1, 2), padding=(0, 1))
+        layer.set_input_shape((2, 6))
+        input = np.random.randn(4, 2, 6)
+
+        expected_output = layer.forward_prop(input)
+        layer._max_activation_indices = None
+
+        output = layer.forward_prop(input, training=False)
+        numpy.testing.assert_array_equal(output, expected_output)
+        self.assertIsNone(layer._max_activation_indices)
+
+    def test_context(self):
+        layer = MaxPoolingLayer((1, 4), stride=(1, 2))
+        layer.set_input_shape((2, 9))
+        input = np.random.randn(3, 2, 9)
+        out_grad = np.random.randn(3, 2, 3)
+
+        expected_output = layer.forward_prop(input)
+        expected_in_grad = layer.back_prop(out_grad)
+        layer._max_activation_indices = None
+
+        context = ForwardContext()
+        output = layer.forward_prop(input, context=context)
+        numpy.testing.assert_array_equal(output, expected_output)
+        numpy.testing.assert_array_equal(layer.back_prop(out_grad, context=context),
+                                         expected_in_grad)
+        self.assertIsNone(layer._max_activation_indices)
+
     def test_get_output_shape(self):
         self.layer.set_input_shape((280, 72))
 
         self.assertEqual(self.layer.get_output_shape(), (280, 36))
 
+        layer = MaxPoolingLayer((1, 4), stride=(1, 2), padding=(0, 1))
+        layer.set_input_shape((32, 73))
+
+        self.assertEqual(layer.get_output_shape(), (32, 36))
+
 if __name__ == '__main__':
     TestMaxPoolingLayer.run()
@@ -27,6 +27,14 @@ class TestSoftmaxLayer(TestCase):
         expected_output = np.array([1, 0, 0, 0], dtype=np.float64)
         numpy.testing.assert_array_equal(output, expected_output)
 
+    def test_forward_prop_batch(self):
+        input = np.array([[43265, 0, 0, 43265],
+                          [43265, 2, 54, 21]], dtype=np.float64)
+        output = self.layer.forward_prop(input)
+        expected_output = np.array([[0.5, 0, 0, 0.5],
+                                    [1, 0, 0, 0]], dtype=np.float64)
+        numpy.testing.assert_array_equal(output, expected_output)
+
     def test_back_prop(self):
         out_grad = np.array([3, 3, 3, 3], dtype=np.float64)
         with self.assertRaises(NotImplementedError):
@@ -42,6 +50,14 @@ class TestSoftmaxLayer(TestCase):
         loss = self.layer.loss(self.predicted, self.true)
         self.assertAlmostEqual(expected_loss, loss)
 
+    def test_loss_batch(self):
+        predicted = np.array([self.predicted, [0.5, 0.25, 0.25]], dtype=np.float64)
+        true = np.array([self.true, [1, 0, 0]], dtype=np.float64)
+        # The losses of the examples in the batch are summed
+        expected_loss = 0.9162907 + 0.6931472
+        loss = self.layer.loss(predicted, true)
+        self.assertAlmostEqual(expected_loss, loss)
+
     def test_get_output_shape(self):
         self.layer.set_input_shape((5, ))
         self.assertEqual(self.layer.get_output_shape(), (5, ))
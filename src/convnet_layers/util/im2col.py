@@ -0,0 +1,108 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def sliding_windows(input, window_w):
+    """
+
+    Parameters
+    ----------
+    input : array of double
+        An array of shape (..., H, W).
+    window_w : int
+        The width of the windows (their height is always H).
+
+    Returns
+    -------
+    array of double
+        A read-only view of shape (..., W - window_w + 1, H, window_w) over the input, where
+        element [..., w, :, :] is the window input[..., :, w:w + window_w]. No data is copied.
+
+    """
+    range_w = input.shape[-1] - window_w + 1
+    shape = input.shape[:-2] + (range_w, input.shape[-2], window_w)
+    strides = input.strides[:-2] + (input.strides[-1], input.strides[-2], input.strides[-1])
+
+    return as_strided(input, shape=shape, strides=strides, writeable=False)
+
+
+def im2col(input, window_w):
+    """
+
+    Parameters
+    ----------
+    input : array of double
+        An array of shape (..., H, W).
+    window_w : int
+        The width of the windows (their height is always H).
+
+    Returns
+    -------
+    array of double
+        A contiguous array of shape (..., W - window_w + 1, H * window_w), in which each row is
+        one unrolled window of the input.
+
+    """
+    windows = sliding_windows(input, window_w)
+    return windows.reshape(windows.shape[:-2] + (windows.shape[-2] * window_w,))
+
+
+def col2im(cols, input_shape, window_w):
+    """
+
+    Parameters
+    ----------
+    cols : array of double
+        An array of shape (..., W - window_w + 1, H * window_w) holding one unrolled window per
+        row, as produced by im2col().
+    input_shape : tuple
+        The shape (..., H, W) of the array the windows were extracted from.
+    window_w : int
+        The width of the windows.
+
+    Returns
+    -------
+    array of double
+        An array of the given input shape, in which each element is the sum of all window entries
+        which overlap its location.
+
+    """
+    range_w = input_shape[-1] - window_w + 1
+    windows = cols.reshape(cols.shape[:-1] + (input_shape[-2], window_w))
+
+    output = np.zeros(input_shape, dtype=cols.dtype)
+    # Scatter one window column at a time: column k of every window lands in the input columns
+    # k, ..., k + range_w - 1
+    for k in range(window_w):
+        output[..., k:k + range_w] += np.swapaxes(windows[..., k], -1, -2)
+
+    return output
+
+
+def pooling_windows(input, window_shape, stride):
+    """
+
+    Parameters
+    ----------
+    input : array of double
+        An array of shape (..., H, W).
+    window_shape : tuple
+        The shape (h, w) of the windows.
+    stride : tuple
+        The vertical and horizontal distance between the top left corners of successive windows.
+
+    Returns
+    -------
+    array of double
+        A read-only view of shape (..., (H - h) / stride[0] + 1, (W - w) / stride[1] + 1, h, w) over
+        the input, where element [..., i, j, :, :] is the window starting at row i * stride[0] and
+        column j * stride[1]. Windows may overlap, and no data is copied.
+
+    """
+    range_i = (input.shape[-2] - window_shape[0]) / stride[0] + 1
+    range_j = (input.shape[-1] - window_shape[1]) / stride[1] + 1
+    shape = input.shape[:-2] + (range_i, range_j) + tuple(window_shape)
+    strides = input.strides[:-2] + (input.strides[-2] * stride[0], input.strides[-1] * stride[1],
+                                    input.strides[-2], input.strides[-1])
+
+    return as_strided(input, shape=shape, strides=strides, writeable=False)
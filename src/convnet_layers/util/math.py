@@ -68,7 +68,7 @@ def d_relu(x):
         The result of applying the derivative of the ReLU function to each element of the input.
 
     """
-    res = np.zeros(x.shape)
+    res = np.zeros(x.shape, dtype=x.dtype)
     res[x > 0] = 1
 
     return res
@@ -111,7 +111,7 @@ def d_leaky_relu(x):
         input.
 
     """
-    res = np.zeros(x.shape)
+    res = np.zeros(x.shape, dtype=x.dtype)
     res[x > 0] = 1
     res[x <= 0] = 0.01
 
@@ -0,0 +1,198 @@
+import ctypes
+import multiprocessing
+import numpy as np
+import traceback
+
+
+class DataParallelTrainer(object):
+
+    def __init__(self, layers, compute_derivatives, input_shape, output_shape, batch_size,
+                 num_workers=None, hogwild=False, dtype=np.float64):
+        """
+
+        Trains a network with a pool of worker processes, each of which processes one shard of
+        every minibatch. The parameters of the layers are moved to shared memory, so that all
+        workers always see the same values, and the workers are then forked.
+
+        By default, the training is synchronous: each worker writes the derivatives for its shard
+        to its own shared buffer, and the buffers are summed (all-reduced) into the derivatives of
+        the given layers, which then update the shared parameters through update_parameters(). The
+        result is the same as processing the whole minibatch in a single process.
+
+        In Hogwild mode, each worker instead calls update_parameters() on the shared parameters
+        as soon as its shard is processed, without any locking, so the updates of the workers
+        race with each other.
+
+        Parameters
+        ----------
+        layers : array of Layer objects
+            The layers with parameters (get_parameters(), get_derivatives(), set_parameters() and
+            update_parameters()).
+        compute_derivatives : function
+            A function (input, true_output) performing forward and back-propagation through the
+            network for a batch of examples, so that the layers accumulate their derivatives.
+        input_shape : tuple
+            The shape of the examples.
+        output_shape : tuple
+            The shape of the encoded correct output for an example.
+        batch_size : int
+            The maximum number of examples in a minibatch.
+        num_workers : int
+            The number of worker processes (by default, the number of CPUs).
+        hogwild : bool
+            Whether the workers update the shared parameters directly, without synchronisation.
+        dtype : numpy.dtype
+            The floating-point type of the network.
+
+        """
+        self._layers = layers
+        self._compute_derivatives = compute_derivatives
+        self._num_workers = num_workers or multiprocessing.cpu_count()
+        self._hogwild = hogwild
+
+        # Move the parameters to shared memory
+        for layer in self._layers:
+            shared_parameters = []
+            for parameter in layer.get_parameters():
+                shared_parameter = _shared_array(parameter.shape, parameter.dtype)
+                shared_parameter[...] = parameter
+                shared_parameters.append(shared_parameter)
+            layer.set_parameters(shared_parameters)
+
+        # One derivative buffer per worker, for each parameter
+        self._derivative_buffers = [_shared_array((self._num_workers,) + derivative.shape,
+                                                  derivative.dtype)
+                                    for layer in self._layers
+                                    for derivative in layer.get_derivatives()]
+
+        # The current minibatch, from which each worker reads its shard
+        self._inputs = _shared_array((batch_size,) + input_shape, dtype)
+        self._true_outputs = _shared_array((batch_size,) + output_shape, dtype)
+
+        self._connections = []
+        self._workers = []
+        for index in range(self._num_workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=self._work, args=(index, worker_connection))
+            worker.daemon = True
+            worker.start()
+
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def train_step(self, input, true_output, learning_rate):
+        """
+
+        Performs forward and back-propagation for a batch of examples, split across the workers,
+        then updates the parameters using the derivatives averaged over the batch.
+
+        Parameters
+        ----------
+        input : numpy.array
+            A batch of spectrograms stacked along the first axis.
+        true_output : numpy.array
+            The encoded correct outputs for the input, stacked in the same way.
+        learning_rate : float
+            The learning rate for updating the parameters.
+
+        """
+        batch_size = input.shape[0]
+        self._inputs[:batch_size] = input
+        self._true_outputs[:batch_size] = true_output
+
+        # Split the batch into (almost) equal contiguous shards
+        bounds = np.linspace(0, batch_size, self._num_workers + 1).astype(int)
+        for index, connection in enumerate(self._connections):
+            connection.send((bounds[index], bounds[index + 1], learning_rate))
+
+        errors = [connection.recv() for connection in self._connections]
+        for error in errors:
+            if error is not None:
+                raise RuntimeError("Training worker failed:\n" + error)
+
+        if not self._hogwild:
+            # Sum the derivatives of all workers, then update the shared parameters
+            derivatives = [derivative for layer in self._layers
+                           for derivative in layer.get_derivatives()]
+            for derivative, buffers in zip(derivatives, self._derivative_buffers):
+                np.sum(buffers, axis=0, out=derivative)
+
+            # The derivatives are summed over the batch
+            for layer in self._layers:
+                layer.update_parameters(learning_rate / batch_size)
+
+    def close(self):
+        """
+
+        Stops the worker processes.
+
+        """
+        for connection in self._connections:
+            connection.send(None)
+        for worker in self._workers:
+            worker.join()
+
+        self._connections = []
+        self._workers = []
+
+    def _work(self, index, connection):
+        """
+
+        Processes the shards sent by train_step() until None is received, replying with None or
+        with the traceback of an exception.
+
+        Parameters
+        ----------
+        index : int
+            The index of this worker.
+        connection : multiprocessing.Connection
+            The connection to the training process.
+
+        """
+        task = connection.recv()
+        while task is not None:
+            start, stop, learning_rate = task
+            try:
+                if stop > start:
+                    self._compute_derivatives(self._inputs[start:stop],
+                                              self._true_outputs[start:stop])
+
+                if self._hogwild:
+                    if stop > start:
+                        for layer in self._layers:
+                            layer.update_parameters(learning_rate / (stop - start))
+                else:
+                    # Hand the derivatives over to the training process
+                    derivatives = [derivative for layer in self._layers
+                                   for derivative in layer.get_derivatives()]
+                    for derivative, buffers in zip(derivatives, self._derivative_buffers):
+                        buffers[index] = derivative
+                        derivative[...] = 0
+
+                connection.send(None)
+            except Exception:
+                connection.send(traceback.format_exc())
+
+            task = connection.recv()
+
+
+def _shared_array(shape, dtype):
+    """
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array.
+    dtype : numpy.dtype
+        The type of the elements of the array.
+
+    Returns
+    -------
+    numpy.array
+        An uninitialised array in shared memory, which is shared with the processes forked
+        afterwards.
+
+    """
+    num_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return np.frombuffer(multiprocessing.RawArray(ctypes.c_char, num_bytes),
+                         dtype=dtype).reshape(shape)
@@ -1,12 +1,29 @@
+import hashlib
+import json
 import numpy as np
+import os
+import shutil
+from collections import namedtuple
 
 import pylab
 from scipy.misc import imread
 
 
+# A batch of examples, stored as three arrays indexed by example:
+#   specs -> the spectrograms, stacked along the first axis
+#   labels -> the genre index of each spectrogram
+#   ids -> the index of the audio file of each spectrogram
+Batch = namedtuple('Batch', ['specs', 'labels', 'ids'])
+
+# The file of a dataset cache recording the parameters it was built with; it is written last, so
+# a cache without it is incomplete
+CACHE_INFO_FILE = 'cache_info.json'
+
+
 class DataProvider(object):
 
-    def __init__(self, num_genres, genre_dataset_size=100):
+    def __init__(self, num_genres, genre_dataset_size=100, cache_dir=None,
+                 spectrogram_format='png', num_frames=599):
         """
 
         Parameters
@@ -15,18 +32,47 @@ class DataProvider(object):
             The number of genres which will be processed by this instance.
         genre_dataset_size : int
             The size of the per-genre dataset.
+        cache_dir : str
+            The directory of a preprocessed dataset cache (see build_cache()). If given, the
+            spectrograms are read from the memory-mapped cache instead of being decoded from the
+            spectrogram files, and the cache is built first if it does not exist yet.
+        spectrogram_format : str
+            The format of the spectrogram files written by spectrogram_extract.py: 'png' for the
+            spectrogram images, or 'npy' for the raw log-mel matrices.
+        num_frames : int
+            The number of frames (columns) of each spectrogram; raw log-mel matrices are cropped,
+            or padded with silence, to this number of frames. Spectrogram images always have 599.
 
         """
         self._genre_dataset_size = genre_dataset_size
+        self._cache_dir = cache_dir
+        self._spectrogram_format = spectrogram_format
+        self._num_frames = num_frames
+        # The floating-point type of the spectrograms handed out (see set_dtype())
+        self._dtype = np.dtype(np.float32)
 
         self._num_genres = num_genres
         self._genres = ['classical', 'metal', 'blues', 'disco', 'hiphop', 'reggae', 'country',
                         'pop', 'jazz', 'rock']
 
         self._current_batch_start_index = 0
-
-        self._train_set = None
-        self._test_set = None
+        # The number of examples of each genre in a training batch
+        self._subbatch_size = 2
+
+        # All spectrograms, their labels and ids, and the row at which each (genre index, id) is
+        # stored
+        self._specs = None
+        self._labels = None
+        self._ids = None
+        self._row_index = None
+        # Features handed out instead of the spectrograms, if any (see compute_features()), and
+        # the row of the features of each example row (-1 for the examples not used)
+        self._features = None
+        self._feature_index = None
+
+        # The rows of the training and test examples, for each genre
+        self._train_rows = None
+        self._test_rows = None
 
         # 90:10 proportion for training and test sets
         self._test_indices = np.empty((self._num_genres, self._genre_dataset_size / 10), dtype=int)
@@ -37,8 +83,19 @@ class DataProvider(object):
             np.random.shuffle(indices)
             self._test_indices[i] = indices[:self._genre_dataset_size / 10]
 
-    @staticmethod
-    def get_input_shape():
+    def set_dtype(self, dtype):
+        """
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            The floating-point type of the spectrograms in the batches handed out. They are always
+            stored as float32, and converted when a batch is retrieved.
+
+        """
+        self._dtype = np.dtype(dtype)
+
+    def get_input_shape(self):
         """
 
         Returns
@@ -47,7 +104,18 @@ class DataProvider(object):
             The shape of the input in the examples provided by DataProvider.
 
         """
-        return (128, 599)
+        return (128, self._num_frames)
+
+    def get_batch_size(self):
+        """
+
+        Returns
+        -------
+        int
+            The (maximum) number of examples in the training batches returned by get_next_batch().
+
+        """
+        return self._num_genres * self._subbatch_size
 
     def get_output_shape(self):
         """
@@ -66,56 +134,45 @@ class DataProvider(object):
         Initialises the training and test sets with data from the _data_provider variable.
 
         """
-        self._train_set = np.empty((self._num_genres, self._genre_dataset_size * 9 / 10),
-                                   dtype=dict)
-        self._test_set = np.empty((self._num_genres, self._genre_dataset_size / 10), dtype=dict)
+        if self._specs is None:
+            if self._cache_dir is None:
+                self._read_spectrograms()
+            else:
+                if not os.path.exists(os.path.join(self._cache_dir, CACHE_INFO_FILE)):
+                    self.build_cache(self._cache_dir)
+                self._open_cache()
 
-        train_count = 0
-        for genre in self._genres:
-            igenre = self._genres.index(genre)
-            if igenre >= self._num_genres:
-                break
+        train_size = self._genre_dataset_size * 9 / 10
+        self._train_rows = np.empty((self._num_genres, train_size), dtype=int)
+        self._test_rows = np.empty((self._num_genres, self._genre_dataset_size / 10), dtype=int)
 
-            test_count = 0
-            for i in range(self._genre_dataset_size):
-                # If the current index represents an example in the test set
-                if i in self._test_indices[igenre]:
-                    # Add the example to the test set
-                    self._test_set[igenre, test_count] = self._get_next_example(genre, i)
-                    test_count += 1
-                else:
-                    # Otherwise add it to the training set
-                    self._train_set[igenre, train_count] = self._get_next_example(genre, i)
-                    train_count += 1
-
-            np.random.shuffle(self._train_set[igenre])
-            train_count = 0
+        for igenre in range(self._num_genres):
+            is_test = np.in1d(np.arange(self._genre_dataset_size), self._test_indices[igenre])
+            self._test_rows[igenre] = self._row_index[igenre, is_test]
+            self._train_rows[igenre] = self._row_index[igenre, ~is_test]
+
+            np.random.shuffle(self._train_rows[igenre])
 
     def get_next_batch(self):
         """
 
         Returns
         -------
-        array of dict
-            An array of training examples, or None, if there are no more examples left to be
+        Batch
+            A batch of training examples, or None, if there are no more examples left to be
             processed.
 
         """
         # If not all training examples have been sent in the previous batches
         if self._current_batch_start_index < self._genre_dataset_size * 9 / 10:
-            # Create a new batch
-            batch = np.empty(self._num_genres * 2, dtype=dict)
-            subbatch_size = 2
+            # Create a new batch from the next examples of each genre
+            rows = self._train_rows[:, self._current_batch_start_index:
+                                       self._current_batch_start_index +
+                                       self._subbatch_size].flatten()
 
-            for i in range(self._num_genres):
-                batch[subbatch_size * i:subbatch_size * (i + 1)] = \
-                    self._train_set[i, self._current_batch_start_index:
-                                       self._current_batch_start_index + subbatch_size]
+            self._current_batch_start_index += self._subbatch_size
 
-            self._current_batch_start_index += subbatch_size
-
-            np.random.shuffle(batch)
-            return batch
+            return self._get_batch(np.random.permutation(rows))
         else:
             return None
 
@@ -124,22 +181,22 @@ class DataProvider(object):
 
         Returns
         -------
-        array of dict
-            An array containing all training examples.
+        Batch
+            A batch containing all training examples.
 
         """
-        return self._train_set.flatten()
+        return self._get_batch(self._train_rows.flatten())
 
     def get_test_data(self):
         """
 
         Returns
         -------
-        array of dict
-            An array containing all test examples.
+        Batch
+            A batch containing all test examples.
 
         """
-        return self._test_set.flatten()
+        return self._get_batch(self._test_rows.flatten())
 
     def get_test_data_for_genre(self, genre):
         """
@@ -151,11 +208,158 @@ class DataProvider(object):
 
         Returns
         -------
-        array of dict
-            An array containing all test examples for the given genre index.
+        Batch
+            A batch containing all test examples for the given genre index.
+
+        """
+        return self._get_batch(self._test_rows[self._genres.index(genre)])
+
+    def compute_features(self, transform, cache_path=None, batch_size=32, feature_shape=None,
+                         fingerprint=None):
+        """
+
+        Applies a transform once to the spectrograms of the training and test examples (e.g. the
+        frozen first layers of a network), and hands out the results in the specs of all batches
+        instead of the spectrograms, until clear_features() is called. The other spectrograms of
+        a dataset cache are not transformed. Should be called after setup().
+
+        Parameters
+        ----------
+        transform : function
+            A function mapping a batch of spectrograms, stacked along the first axis, to the
+            batch of their features.
+        cache_path : str
+            The path of a .npy file in which the features are saved. If it already exists, the
+            features are memory-mapped from it instead of being computed. The fingerprint of the
+            transform, the parameters of the dataset and the rows of the examples are saved
+            next to it, in cache_path + '.json', and a file saved with different ones is
+            rejected. The features are written under a temporary name first, so that an
+            interruption never leaves an incomplete file.
+        batch_size : int
+            The number of spectrograms transformed together.
+        feature_shape : tuple
+            If given, the shape of the features of each spectrogram, against which the saved or
+            computed features are checked.
+        fingerprint : str
+            A string identifying the transform, e.g. a hash of the parameters of the frozen
+            layers, which must change whenever the transform does.
+
+        """
+        # The rows of all examples used by this instance, in increasing order
+        rows = np.union1d(self._train_rows, self._test_rows)
+
+        feature_info = self._feature_info(rows, fingerprint)
+
+        if cache_path is not None and os.path.exists(cache_path):
+            saved_info = None
+            if os.path.exists(cache_path + '.json'):
+                with open(cache_path + '.json', 'r') as info_file:
+                    saved_info = json.load(info_file)
+            if saved_info != feature_info:
+                raise ValueError("The feature cache " + cache_path + " was computed by another " +
+                                 "transform or from other examples; delete it to compute the " +
+                                 "features again")
+
+            features = np.load(cache_path, mmap_mode='r')
+            if features.shape[0] != rows.shape[0] or \
+                    (feature_shape is not None and features.shape[1:] != feature_shape):
+                raise ValueError("The feature cache " + cache_path + " has shape " +
+                                 str(features.shape) + ", which does not match the dataset and " +
+                                 "the transform; delete it to compute the features again")
+        else:
+            num_examples = rows.shape[0]
+            features = None
+            for start in range(0, num_examples, batch_size):
+                batch_features = transform(self._specs[rows[start:start + batch_size]].
+                                           astype(self._dtype, copy=False))
+                if features is None:
+                    assert feature_shape is None or batch_features.shape[1:] == feature_shape, \
+                        "The transform does not produce features of shape " + str(feature_shape)
+                    # Allocate the features once their shape is known
+                    shape = (num_examples,) + batch_features.shape[1:]
+                    if cache_path is None:
+                        features = np.empty(shape, dtype=batch_features.dtype)
+                    else:
+                        features = np.lib.format.open_memmap(cache_path + '.tmp', mode='w+',
+                                                             dtype=batch_features.dtype,
+                                                             shape=shape)
+                features[start:start + batch_size] = batch_features
+
+            if cache_path is not None:
+                # Only give the file its name once all features and their description are
+                # written
+                features.flush()
+                del features
+                with open(cache_path + '.json.tmp', 'w') as info_file:
+                    json.dump(feature_info, info_file, indent=1, sort_keys=True)
+                os.rename(cache_path + '.json.tmp', cache_path + '.json')
+                os.rename(cache_path + '.tmp', cache_path)
+                features = np.load(cache_path, mmap_mode='r')
+
+        self._features = features
+        self._feature_index = np.full(self._specs.shape[0], -1, dtype=int)
+        self._feature_index[rows] = np.arange(rows.shape[0])
+
+    def _feature_info(self, rows, fingerprint):
+        """
+
+        Parameters
+        ----------
+        rows : array of int
+            The rows of the examples whose features are computed.
+        fingerprint : str
+            The fingerprint of the transform (see compute_features()).
+
+        Returns
+        -------
+        dict
+            The description saved with the features in a feature cache, in the form read back
+            from its JSON file.
+
+        """
+        return dict(fingerprint=fingerprint, dataset=self._cache_info(), dtype=self._dtype.str,
+                    rows=hashlib.md5(np.ascontiguousarray(rows, dtype=np.int64).tostring()).hexdigest())
+
+    def clear_features(self):
+        """
+
+        Hands out the spectrograms again, instead of the features computed by compute_features().
+
+        """
+        self._features = None
+        self._feature_index = None
+
+    def get_state(self):
+        """
+
+        Returns
+        -------
+        dict
+            The split of the dataset into training and test sets, the current order of the
+            training examples and the position of the next batch, in a JSON-serialisable form (see
+            set_state()). Should be called after setup().
 
         """
-        return self._test_set[self._genres.index(genre), :].flatten()
+        return dict(test_indices=self._test_indices.tolist(), train_rows=self._train_rows.tolist(),
+                    batch_start_index=self._current_batch_start_index)
+
+    def set_state(self, state):
+        """
+
+        Restores a state returned by get_state(), e.g. to resume an interrupted training iteration
+        with the same training and test sets. Sets up the instance if needed.
+
+        Parameters
+        ----------
+        state : dict
+            A state returned by get_state().
+
+        """
+        self._test_indices = np.array(state['test_indices'], dtype=int)
+        self.setup()
+
+        self._train_rows = np.array(state['train_rows'], dtype=int)
+        self._current_batch_start_index = state['batch_start_index']
 
     def reset(self):
         """
@@ -167,33 +371,176 @@ class DataProvider(object):
 
         # Shuffle training examples as required by stochastic gradient descent
         for i in range(self._num_genres):
-            np.random.shuffle(self._train_set[i, :])
+            np.random.shuffle(self._train_rows[i])
+
+    def _get_batch(self, rows):
+        """
+
+        Parameters
+        ----------
+        rows : array of int
+            The rows of the examples we wish to retrieve.
+
+        Returns
+        -------
+        Batch
+            The examples at the given rows, in the same order, copied into contiguous arrays.
+
+        """
+        if self._features is None:
+            specs = self._specs[rows]
+        else:
+            specs = self._features[self._feature_index[rows]]
+        return Batch(specs=specs.astype(self._dtype, copy=False), labels=self._labels[rows],
+                     ids=self._ids[rows])
 
-    def _get_next_example(self, genre, id):
+    def build_cache(self, cache_dir):
+        """
+
+        Decodes the spectrograms of all genres once and writes them to a preprocessed dataset
+        cache, made of three .npy files:
+            - specs.npy: a contiguous float32 array of shape (N, 128, num_frames) with all
+                         spectrograms
+            - labels.npy: the genre index of each spectrogram
+            - ids.npy: the audio file index of each spectrogram
+        and of CACHE_INFO_FILE, which records the parameters of the cache. The cache is built in a
+        temporary directory, which only replaces the cache directory once complete.
+
+        Parameters
+        ----------
+        cache_dir : str
+            The directory in which the cache files are written.
+
+        """
+        build_dir = os.path.normpath(cache_dir) + '.tmp'
+        # Discard the files of an interrupted build
+        if os.path.exists(build_dir):
+            shutil.rmtree(build_dir)
+        os.makedirs(build_dir)
+
+        num_examples = len(self._genres) * self._genre_dataset_size
+        # Write the spectrograms straight to disk rather than keeping all of them in memory
+        specs = np.lib.format.open_memmap(os.path.join(build_dir, 'specs.npy'), mode='w+',
+                                          dtype=np.float32,
+                                          shape=(num_examples,) + self.get_input_shape())
+        labels = np.empty(num_examples, dtype=np.int32)
+        ids = np.empty(num_examples, dtype=np.int32)
+
+        count = 0
+        for genre in self._genres:
+            for i in range(self._genre_dataset_size):
+                specs[count] = self._read_spectrogram(genre, i)
+                labels[count] = self._genres.index(genre)
+                ids[count] = i
+                count += 1
+
+        specs.flush()
+        del specs
+        np.save(os.path.join(build_dir, 'labels.npy'), labels)
+        np.save(os.path.join(build_dir, 'ids.npy'), ids)
+        with open(os.path.join(build_dir, CACHE_INFO_FILE), 'w') as info_file:
+            json.dump(self._cache_info(), info_file, indent=1, sort_keys=True)
+
+        # Replace any incomplete or outdated cache
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.rename(build_dir, cache_dir)
+
+    def _cache_info(self):
+        """
+
+        Returns
+        -------
+        dict
+            The parameters of the dataset cache built by this instance.
+
+        """
+        return dict(genre_dataset_size=self._genre_dataset_size,
+                    spectrogram_format=self._spectrogram_format, num_frames=self._num_frames)
+
+    def _open_cache(self):
+        """
+
+        Memory-maps the spectrograms of the dataset cache and indexes them by (genre index, id),
+        after checking that the cache contains the examples used by this instance.
+
+        """
+        with open(os.path.join(self._cache_dir, CACHE_INFO_FILE), 'r') as info_file:
+            info = json.load(info_file)
+        if info['genre_dataset_size'] < self._genre_dataset_size:
+            raise ValueError("The dataset cache in " + self._cache_dir + " has " +
+                             str(info['genre_dataset_size']) + " examples per genre, not " +
+                             str(self._genre_dataset_size) + "; delete it to rebuild it")
+        for key in ['spectrogram_format', 'num_frames']:
+            if info.get(key) != self._cache_info()[key]:
+                raise ValueError("The dataset cache in " + self._cache_dir + " was built with " +
+                                 key + " " + str(info.get(key)) + ", not " +
+                                 str(self._cache_info()[key]) + "; delete it to rebuild it")
+
+        self._specs = np.load(os.path.join(self._cache_dir, 'specs.npy'), mmap_mode='r')
+        if self._specs.shape[1:] != self.get_input_shape():
+            raise ValueError("The spectrograms of the dataset cache in " + self._cache_dir +
+                             " have shape " + str(self._specs.shape[1:]) + ", not " +
+                             str(self.get_input_shape()) + "; delete it to rebuild it")
+        self._labels = np.load(os.path.join(self._cache_dir, 'labels.npy'))
+        self._ids = np.load(os.path.join(self._cache_dir, 'ids.npy'))
+
+        # -1 marks the examples missing from the cache
+        self._row_index = np.full((self._num_genres, self._genre_dataset_size), -1, dtype=int)
+        # Only the rows of the genres and ids processed by this instance are used
+        used = (self._labels < self._num_genres) & (self._ids < self._genre_dataset_size)
+        self._row_index[self._labels[used], self._ids[used]] = np.flatnonzero(used)
+
+        missing = np.argwhere(self._row_index < 0)
+        if missing.shape[0] > 0:
+            genre, id = missing[0]
+            raise ValueError("The dataset cache in " + self._cache_dir + " misses " +
+                             str(missing.shape[0]) + " examples, e.g. " + self._genres[genre] +
+                             " " + str(id) + "; delete it to rebuild it")
+
+    def _read_spectrograms(self):
+        """
+
+        Decodes the spectrograms of the genres processed by this instance, one row per example.
+
+        """
+        num_examples = self._num_genres * self._genre_dataset_size
+        self._specs = np.empty((num_examples,) + self.get_input_shape(), dtype=np.float32)
+        self._labels = np.repeat(np.arange(self._num_genres), self._genre_dataset_size)
+        self._ids = np.tile(np.arange(self._genre_dataset_size), self._num_genres)
+        self._row_index = np.arange(num_examples).reshape(self._num_genres,
+                                                          self._genre_dataset_size)
+
+        for row in range(num_examples):
+            self._specs[row] = self._read_spectrogram(self._genres[self._labels[row]],
+                                                      self._ids[row])
+
+    def _read_spectrogram(self, genre, id):
         """
 
         Parameters
         ----------
         genre : str
-            The name of the genre we wish to retrieve the next example for.
+            The name of the genre of the audio file.
         id : int
-            The index of the audio file for which we wish to obtain the corresponding data.
+            The index of the audio file.
 
         Returns
         -------
-        dict{
-            'spec' -> array of float (the grescale intensities of the spectrogram image),
-            'out' -> array of float (the encoded correct output of the network for this example;
-                                     output[index(genre)] = 1 and output[i] = 0 otherwise),
-            'id' -> the index of the audio file
-        }
+        array of float
+            The spectrogram of the audio file, with values between 0 and 1.
 
         """
         id_str = '000' + str(id)
         if id < 10:
             id_str = '0' + id_str
         # Create path to spectrogram file
-        filename = '../../spectrograms/' + genre + '/' + genre + '.' + id_str + '.png'
+        filename = '../../spectrograms/' + genre + '/' + genre + '.' + id_str + '.' + \
+                   self._spectrogram_format
+
+        if self._spectrogram_format == 'npy':
+            return self._read_log_mel(filename)
+
         # Read image in array
         im = imread(filename)
         # Convert RGB information to grayscale values
@@ -201,8 +548,32 @@ class DataProvider(object):
         # Normalise
         im_gray /= 255.0
 
-        # Use one-hot encoding to specify the corresponding genre
-        output = np.zeros(self._num_genres)
-        output[self._genres.index(genre)] = 1
+        return im_gray
+
+    def _read_log_mel(self, filename):
+        """
+
+        Parameters
+        ----------
+        filename : str
+            The path of a raw log-mel matrix, in decibels relative to its maximum.
+
+        Returns
+        -------
+        array of float
+            The log-mel matrix with num_frames columns, with values scaled from [-80dB, 0dB] to
+            [0, 1].
+
+        """
+        log_mel = np.load(filename)
+
+        spec = np.zeros(self.get_input_shape(), dtype=np.float32)
+        num_frames = min(self._num_frames, log_mel.shape[1])
+        # The log-amplitudes are clipped at 80dB below the maximum when extracted
+        spec[:, :num_frames] = (log_mel[:, :num_frames] + 80.0) / 80.0
+
+        return spec
+
 
-        return dict(spec=im_gray, out=output, id=id)
+if __name__ == '__main__':
+    DataProvider(num_genres=10).build_cache('../../dataset_cache/')
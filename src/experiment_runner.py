@@ -0,0 +1,128 @@
+import json
+import multiprocessing
+import numpy as np
+import os
+import struct
+import time
+
+
+def run_experiments(experiment, run_indices, num_workers=None, results_path='results.json'):
+    """
+
+    Performs independent runs of an experiment in a pool of worker processes, and collects their
+    results in a JSON file. The file is rewritten after each completed run, so the results of the
+    finished runs are kept if the others are interrupted.
+
+    The number of BLAS threads is not changed here: it should be limited (e.g. OMP_NUM_THREADS=1)
+    before numpy is first imported, so that the workers do not oversubscribe the cores.
+
+    Parameters
+    ----------
+    experiment : function
+        A module-level function which performs one run, given its index, and returns its results
+        (e.g. the results of a ConvNet).
+    run_indices : array of int
+        The indices of the runs to perform.
+    num_workers : int
+        The number of runs performed at the same time (by default, the number of CPUs).
+    results_path : str
+        The path of the JSON file in which the results are written.
+
+    Returns
+    -------
+    dict
+        The contents of the results file: the name of the experiment and, for each run, its index,
+        random seed, duration and results, in order of completion.
+
+    """
+    summary = dict(experiment=experiment.__name__, runs=[])
+
+    pool = multiprocessing.Pool(num_workers)
+    try:
+        tasks = [(experiment, run_idx, _random_seed()) for run_idx in run_indices]
+        for run in pool.imap_unordered(_run_experiment, tasks):
+            print 'Run %d finished in %.1fs' % (run['run'], run['time'])
+
+            summary['runs'].append(run)
+            _write_results(results_path, summary)
+    finally:
+        pool.terminate()
+
+    return summary
+
+
+def _run_experiment(task):
+    """
+
+    Parameters
+    ----------
+    task : tuple
+        The experiment function, the index of the run and the random seed for the run.
+
+    Returns
+    -------
+    dict
+        The index, seed, duration and results of the run.
+
+    """
+    experiment, run_idx, seed = task
+
+    # The workers are forked with the same random state, so each run needs its own seed
+    np.random.seed(seed)
+
+    start = time.time()
+    results = experiment(run_idx)
+
+    return dict(run=run_idx, seed=seed, time=time.time() - start, results=_to_json(results))
+
+
+def _random_seed():
+    """
+
+    Returns
+    -------
+    int
+        A random seed for numpy, taken from the entropy source of the operating system.
+
+    """
+    return struct.unpack('I', os.urandom(4))[0]
+
+
+def _to_json(value):
+    """
+
+    Parameters
+    ----------
+    value : object
+        A value made of dictionaries, lists, numbers, strings and numpy arrays or scalars.
+
+    Returns
+    -------
+    object
+        The same value, with the numpy arrays and scalars converted to lists and numbers.
+
+    """
+    if isinstance(value, dict):
+        return dict((key, _to_json(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def _write_results(results_path, summary):
+    """
+
+    Parameters
+    ----------
+    results_path : str
+        The path of the results file.
+    summary : dict
+        The contents of the results file.
+
+    """
+    # Write to a temporary file first, so that an interruption never leaves a truncated file
+    with open(results_path + '.tmp', 'w') as results_file:
+        json.dump(summary, results_file, indent=1, sort_keys=True)
+    os.rename(results_path + '.tmp', results_path)
@@ -0,0 +1,100 @@
+import json
+import numpy as np
+import os
+
+from convnet_layers.activation_layer import ActivationLayer
+from convnet_layers.conv_layer import ConvLayer
+from convnet_layers.fullyconnected_layer import FullyConnectedLayer
+from convnet_layers.globalpooling_layer import GlobalPoolingLayer
+from convnet_layers.softmax_layer import SoftmaxLayer
+from data_provider import CACHE_INFO_FILE
+
+
+# The input shape of the network built by small_network()
+SMALL_INPUT_SHAPE = (8, 12)
+
+
+def setup_layers(layers, input_shape):
+    """
+
+    Sets the input shapes of the layers in order, as ConvNet.setup_layers() does.
+
+    Parameters
+    ----------
+    layers : array of Layer objects
+        The layers of a network.
+    input_shape : tuple
+        The shape of the input of the first layer.
+
+    Returns
+    -------
+    array of Layer objects
+        The layers.
+
+    """
+    shape = input_shape
+    for layer in layers:
+        layer.set_input_shape(shape)
+        shape = layer.get_output_shape()
+    return layers
+
+
+def small_network(num_outputs=5, activation_layer=None, input_shape=SMALL_INPUT_SHAPE):
+    """
+
+    Parameters
+    ----------
+    num_outputs : int
+        The number of classes.
+    activation_layer : Layer
+        The layer following the convolutional layer (by default, a leaky ReLU).
+    input_shape : tuple
+        The shape of the inputs of the network.
+
+    Returns
+    -------
+    array of Layer objects
+        The layers of a small convolutional network for the tests, set up for the input shape.
+
+    """
+    if activation_layer is None:
+        activation_layer = ActivationLayer('leakyReLU')
+    return setup_layers([ConvLayer(4, (input_shape[0], 3), 0.1), activation_layer,
+                         GlobalPoolingLayer(), FullyConnectedLayer(num_outputs, 0.1),
+                         SoftmaxLayer()],
+                        input_shape)
+
+
+def write_cache(cache_dir, num_frames=599, keep=None, info=None):
+    """
+
+    Writes a small dataset cache (see DataProvider.build_cache()) of 10 genres with 40 examples
+    each, in which each spectrogram is filled with (genre index * 100 + id) / 1000.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The directory in which the cache files are written.
+    num_frames : int
+        The number of frames of the spectrograms.
+    keep : array of bool
+        If given, selects the examples which are written.
+    info : dict
+        Parameters recorded in the cache instead of those it was written with.
+
+    """
+    labels = np.repeat(np.arange(10), 40).astype(np.int32)
+    ids = np.tile(np.arange(40), 10).astype(np.int32)
+    if keep is not None:
+        labels = labels[keep]
+        ids = ids[keep]
+    specs = ((labels * 100 + ids) / 1000.0).astype(np.float32)[:, None, None] * \
+        np.ones((1, 128, num_frames), dtype=np.float32)
+    np.save(os.path.join(cache_dir, 'specs.npy'), specs)
+    np.save(os.path.join(cache_dir, 'labels.npy'), labels)
+    np.save(os.path.join(cache_dir, 'ids.npy'), ids)
+
+    cache_info = dict(genre_dataset_size=40, spectrogram_format='png', num_frames=num_frames)
+    cache_info.update(info or {})
+    with open(os.path.join(cache_dir, CACHE_INFO_FILE), 'w') as info_file:
+        json.dump(cache_info, info_file)
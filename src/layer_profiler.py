@@ -0,0 +1,123 @@
+import numpy as np
+import threading
+import timeit
+
+
+PHASES = ['forward', 'backward', 'update']
+
+
+class LayerProfiler(object):
+
+    def __init__(self, layers, callback=None):
+        """
+
+        Records, for each layer of a network and each phase (forward, backward and update), the
+        cumulative wall time, the number of calls and the number of bytes of the arrays returned by
+        the layer (outputs and gradients), which are allocated by the layers that do not reuse
+        their buffers.
+
+        Parameters
+        ----------
+        layers : array of Layer objects
+            The layers of the network, in order.
+        callback : function
+            If given, called after each profiled call with the index of the layer, the name of its
+            type, the phase, the wall time in seconds and the number of bytes returned.
+
+        """
+        self._layers = layers
+        self._layer_indices = dict((id(layer), index) for index, layer in enumerate(layers))
+        self._callback = callback
+        # The predictions of several threads can be profiled at the same time
+        self._lock = threading.Lock()
+        self.reset()
+
+    def call(self, layer, phase, function, *args, **kwargs):
+        """
+
+        Calls a method of a layer and records its cost.
+
+        Parameters
+        ----------
+        layer : Layer
+            The layer whose method is called.
+        phase : str
+            The phase of the call, one of PHASES.
+        function : function
+            The method of the layer (e.g. layer.forward_prop).
+        *args, **kwargs
+            The arguments of the method.
+
+        Returns
+        -------
+        object
+            The result of the method.
+
+        """
+        start = timeit.default_timer()
+        result = function(*args, **kwargs)
+        elapsed = timeit.default_timer() - start
+
+        num_bytes = result.nbytes if isinstance(result, np.ndarray) else 0
+        index = self._layer_indices[id(layer)]
+        with self._lock:
+            stats = self._stats[(index, phase)]
+            stats[0] += elapsed
+            stats[1] += 1
+            stats[2] += num_bytes
+
+        if self._callback is not None:
+            self._callback(index, type(layer).__name__, phase, elapsed, num_bytes)
+
+        return result
+
+    def reset(self):
+        """
+
+        Discards all the recorded costs.
+
+        """
+        with self._lock:
+            # The wall time, number of calls and number of bytes for each layer and phase
+            self._stats = dict(((index, phase), [0.0, 0, 0])
+                               for index in range(len(self._layers)) for phase in PHASES)
+
+    def report(self):
+        """
+
+        Returns
+        -------
+        array of dict
+            For each layer and phase which has been called, in order: the index of the layer
+            ('layer'), the name of its type ('name'), the phase ('phase'), the cumulative wall time
+            in seconds ('time'), its fraction of the total recorded time ('fraction'), the number of
+            calls ('calls') and the number of bytes returned ('bytes').
+
+        """
+        with self._lock:
+            stats = dict((key, list(value)) for key, value in self._stats.items())
+
+        total_time = sum(value[0] for value in stats.values())
+        report = []
+        for index, layer in enumerate(self._layers):
+            for phase in PHASES:
+                time, calls, num_bytes = stats[(index, phase)]
+                if calls > 0:
+                    report.append(dict(layer=index, name=type(layer).__name__, phase=phase,
+                                       time=time, fraction=time / total_time if total_time else 0.0,
+                                       calls=calls, bytes=num_bytes))
+
+        return report
+
+    def print_report(self):
+        """
+
+        Prints the report as a table, one row per layer and phase.
+
+        """
+        print '%-5s %-28s %-8s %10s %7s %9s %12s' % ('layer', 'type', 'phase', 'time (s)', '%',
+                                                     'calls', 'MB')
+        for row in self.report():
+            print '%-5d %-28s %-8s %10.3f %6.1f%% %9d %12.1f' % (
+                row['layer'], row['name'], row['phase'], row['time'], 100 * row['fraction'],
+                row['calls'], row['bytes'] / 1e6)
@@ -4,18 +4,16 @@ import os
 import time
 
 from convnet_layers.activation_layer import ActivationLayer
-from convnet_layers.activation_layer_cuda import ActivationLayerCUDA
 from convnet_layers.conv_layer import ConvLayer
-from convnet_layers.conv_layer_cuda import ConvLayerCUDA
 from convnet_layers.fullyconnected_layer import FullyConnectedLayer
-from convnet_layers.fullyconnected_layer_cuda import FullyConnectedLayerCUDA
 from convnet_layers.globalpooling_layer import GlobalPoolingLayer
-from convnet_layers.globalpooling_layer_cuda import GlobalPoolingLayerCUDA
 from convnet_layers.maxpooling_layer import MaxPoolingLayer
-from convnet_layers.maxpooling_layer_cuda import MaxPoolingLayerCUDA
 
 
 def activation(dir_path, runs):
+    # Imported here, so that the statistics can be plotted on machines without CUDA
+    from convnet_layers.activation_layer_cuda import ActivationLayerCUDA
+
     print "-----------> Activation \n"
 
     f_cpu_fwdprop = open(dir_path + 'cpu_fwdprop.txt', 'w')
@@ -85,6 +83,9 @@ def activation(dir_path, runs):
 
 
 def conv(dir_path, runs):
+    # Imported here, so that the statistics can be plotted on machines without CUDA
+    from convnet_layers.conv_layer_cuda import ConvLayerCUDA
+
     print "-----------> Convolutional \n"
 
     f_cpu_fwdprop = open(dir_path + 'cpu_fwdprop.txt', 'w')
@@ -160,6 +161,9 @@ def conv(dir_path, runs):
 
 
 def fully_connected(dir_path, runs):
+    # Imported here, so that the statistics can be plotted on machines without CUDA
+    from convnet_layers.fullyconnected_layer_cuda import FullyConnectedLayerCUDA
+
     print "-----------> Fully-Connected \n"
 
     f_cpu_fwdprop = open(dir_path + 'cpu_fwdprop.txt', 'w')
@@ -228,6 +232,9 @@ def fully_connected(dir_path, runs):
 
 
 def global_pooling(dir_path, runs):
+    # Imported here, so that the statistics can be plotted on machines without CUDA
+    from convnet_layers.globalpooling_layer_cuda import GlobalPoolingLayerCUDA
+
     print "-----------> Global Pooling \n"
 
     f_cpu_fwdprop = open(dir_path + 'cpu_fwdprop.txt', 'w')
@@ -297,6 +304,9 @@ def global_pooling(dir_path, runs):
 
 
 def max_pooling(dir_path, runs):
+    # Imported here, so that the statistics can be plotted on machines without CUDA
+    from convnet_layers.maxpooling_layer_cuda import MaxPoolingLayerCUDA
+
     print "-----------> Max Pooling \n"
 
     f_cpu_fwdprop = open(dir_path + 'cpu_fwdprop.txt', 'w')
@@ -0,0 +1,230 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+# Mel filterbanks and windows already computed, indexed by their parameters
+_filterbanks = {}
+_windows = {}
+
+
+def log_mel_spectrograms(signals, sampling_rate, n_fft=1024, hop_length=512, n_mels=128,
+                         fmax=10000.0, top_db=80.0):
+    """
+    Computes the log-mel spectrograms of one or more audio clips, as extracted by
+    spectrogram_extract.py (decibels relative to the maximum of each spectrogram).
+
+    Parameters
+    ----------
+    signals : numpy.array
+        A mono audio signal, or an array of equal-length signals of shape (num_clips, num_samples).
+    sampling_rate : int
+        The sampling rate of the signals.
+    n_fft : int
+        The length of the FFT window.
+    hop_length : int
+        The number of samples between successive frames.
+    n_mels : int
+        The number of mel frequency bins.
+    fmax : float
+        The highest frequency of the mel filterbank.
+    top_db : float
+        The values more than top_db decibels below the maximum of a spectrogram are clipped.
+
+    Returns
+    -------
+    numpy.array
+        The log-mel spectrogram(s), of shape (n_mels, frames) or (num_clips, n_mels, frames).
+
+    """
+    spectrograms = mel_spectrograms(signals, sampling_rate, n_fft=n_fft, hop_length=hop_length,
+                                    n_mels=n_mels, fmax=fmax)
+
+    log_spectrograms = 10.0 * np.log10(np.maximum(spectrograms, 1e-10))
+    # Use the maximum of each spectrogram as the reference power
+    log_spectrograms -= np.amax(log_spectrograms, axis=(-2, -1), keepdims=True)
+
+    return np.maximum(log_spectrograms, -top_db)
+
+
+def mel_spectrograms(signals, sampling_rate, n_fft=1024, hop_length=512, n_mels=128,
+                     fmax=10000.0):
+    """
+    Computes the mel power spectrograms of one or more audio clips, with a single FFT call over
+    all frames of all clips.
+
+    Parameters
+    ----------
+    signals : numpy.array
+        A mono audio signal, or an array of equal-length signals of shape (num_clips, num_samples).
+    sampling_rate : int
+        The sampling rate of the signals.
+    n_fft : int
+        The length of the FFT window.
+    hop_length : int
+        The number of samples between successive frames.
+    n_mels : int
+        The number of mel frequency bins.
+    fmax : float
+        The highest frequency of the mel filterbank.
+
+    Returns
+    -------
+    numpy.array
+        The mel spectrogram(s), of shape (n_mels, frames) or (num_clips, n_mels, frames).
+
+    """
+    frames = _frame(np.asarray(signals, dtype=np.float64), n_fft, hop_length)
+
+    power_spectra = np.abs(np.fft.rfft(frames * hann_window(n_fft), axis=-1)) ** 2
+    filterbank = mel_filterbank(sampling_rate, n_fft, n_mels=n_mels, fmax=fmax)
+
+    # Apply the filterbank to all frames with one matrix multiplication
+    spectrograms = np.dot(power_spectra.reshape(-1, power_spectra.shape[-1]), filterbank.T)
+    spectrograms = spectrograms.reshape(power_spectra.shape[:-1] + (n_mels,))
+
+    return np.swapaxes(spectrograms, -1, -2)
+
+
+def mel_filterbank(sampling_rate, n_fft, n_mels=128, fmin=0.0, fmax=None):
+    """
+
+    Parameters
+    ----------
+    sampling_rate : int
+        The sampling rate of the signals.
+    n_fft : int
+        The length of the FFT window.
+    n_mels : int
+        The number of mel frequency bins.
+    fmin : float
+        The lowest frequency of the filterbank.
+    fmax : float
+        The highest frequency of the filterbank (by default, the Nyquist frequency).
+
+    Returns
+    -------
+    numpy.array
+        The (read-only, cached) matrix of shape (n_mels, 1 + n_fft / 2) which maps a power
+        spectrum to the mel scale, using triangular filters with unit area (Slaney's
+        normalisation, as in librosa).
+
+    """
+    if fmax is None:
+        fmax = sampling_rate / 2.0
+
+    key = (sampling_rate, n_fft, n_mels, fmin, fmax)
+    if key not in _filterbanks:
+        fft_frequencies = np.linspace(0, sampling_rate / 2.0, 1 + n_fft // 2)
+        # The edges of the triangular filters, equally spaced on the mel scale
+        mel_range = _hz_to_mel(np.array([fmin, fmax]))
+        mel_frequencies = _mel_to_hz(np.linspace(mel_range[0], mel_range[1], n_mels + 2))
+
+        lower = mel_frequencies[:-2, np.newaxis]
+        centre = mel_frequencies[1:-1, np.newaxis]
+        upper = mel_frequencies[2:, np.newaxis]
+        filterbank = np.maximum(0, np.minimum((fft_frequencies - lower) / (centre - lower),
+                                              (upper - fft_frequencies) / (upper - centre)))
+        filterbank *= 2.0 / (upper - lower)
+
+        filterbank.flags.writeable = False
+        _filterbanks[key] = filterbank
+
+    return _filterbanks[key]
+
+
+def hann_window(n_fft):
+    """
+
+    Parameters
+    ----------
+    n_fft : int
+        The length of the FFT window.
+
+    Returns
+    -------
+    numpy.array
+        The (read-only, cached) periodic Hann window of the given length.
+
+    """
+    if n_fft not in _windows:
+        window = 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)
+
+        window.flags.writeable = False
+        _windows[n_fft] = window
+
+    return _windows[n_fft]
+
+
+def _frame(signals, n_fft, hop_length):
+    """
+
+    Parameters
+    ----------
+    signals : numpy.array
+        A signal, or an array of equal-length signals stacked along the first axis.
+    n_fft : int
+        The length of the frames.
+    hop_length : int
+        The number of samples between successive frames.
+
+    Returns
+    -------
+    numpy.array
+        A read-only view of shape (..., frames, n_fft) of the signals, reflection-padded by
+        n_fft / 2 samples at both ends so that frames are centred on multiples of hop_length.
+
+    """
+    pad = [(0, 0)] * (signals.ndim - 1) + [(n_fft // 2, n_fft // 2)]
+    padded = np.pad(signals, pad, mode='reflect')
+
+    num_frames = 1 + (padded.shape[-1] - n_fft) // hop_length
+    shape = padded.shape[:-1] + (num_frames, n_fft)
+    strides = padded.strides[:-1] + (padded.strides[-1] * hop_length, padded.strides[-1])
+
+    return as_strided(padded, shape=shape, strides=strides, writeable=False)
+
+
+def _hz_to_mel(frequencies):
+    """
+
+    Parameters
+    ----------
+    frequencies : numpy.array
+        Frequencies in Hz.
+
+    Returns
+    -------
+    numpy.array
+        The frequencies on Slaney's mel scale: linear below 1kHz and logarithmic above.
+
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    mels = frequencies * 3.0 / 200.0
+
+    log_region = frequencies >= 1000.0
+    mels[log_region] = 15.0 + np.log(frequencies[log_region] / 1000.0) / (np.log(6.4) / 27.0)
+
+    return mels
+
+
+def _mel_to_hz(mels):
+    """
+
+    Parameters
+    ----------
+    mels : numpy.array
+        Frequencies on Slaney's mel scale.
+
+    Returns
+    -------
+    numpy.array
+        The frequencies in Hz (the inverse of _hz_to_mel()).
+
+    """
+    mels = np.asarray(mels, dtype=np.float64)
+    frequencies = mels * 200.0 / 3.0
+
+    log_region = mels >= 15.0
+    frequencies[log_region] = 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels[log_region] - 15.0))
+
+    return frequencies
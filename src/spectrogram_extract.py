@@ -1,7 +1,18 @@
+import hashlib
+import json
 import librosa
+import multiprocessing
 import numpy
 import os
 import pylab
+import sys
+import time
+
+import mel_frontend
+
+
+GENRES = ['blues', 'classical', 'country', 'disco', 'hiphop', 'jazz', 'metal', 'pop', 'reggae',
+          'rock']
 
 
 def spectrograms_for_genre(genre_name):
@@ -13,37 +24,239 @@ def spectrograms_for_genre(genre_name):
     genre_name : str
         The name of the genre we wish to extract spectrograms for
     """
+    extract_spectrograms([genre_name], num_workers=1)
+
+
+def extract_spectrograms(genres, num_workers=None, output_format='png',
+                         manifest_path='../../spectrograms/manifest.json'):
+    """
+    Extract spectrograms of audio files belonging to the given genres, using a pool of worker
+    processes. Audio files which are unchanged since their spectrogram was last extracted (as
+    recorded in the manifest) are skipped, so an interrupted extraction can be resumed.
+
+    Parameters
+    ----------
+    genres : array of str
+        The names of the genres we wish to extract spectrograms for
+    num_workers : int
+        The number of worker processes (by default, the number of CPUs)
+    output_format : str
+        'png' to save the rendered spectrogram image, or 'npy' to save the raw float32 log-mel
+        matrix of shape (128, frames), in decibels relative to its maximum
+    manifest_path : str
+        The path of the JSON file recording the spectrograms which are up to date
+    """
+    manifest_path = os.path.abspath(os.path.join(os.getcwd(), manifest_path))
+    manifest = _read_manifest(manifest_path)
+
+    # Only extract the spectrograms of new or changed audio files
+    tasks = []
+    for genre_name in genres:
+        # Create directory, if not already existent
+        dir_path = os.path.abspath(os.path.join(os.getcwd(), '../../spectrograms/', genre_name))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+        for song_index in range(0, 100):
+            filepath = _audio_filepath(genre_name, song_index)
+            if not _is_up_to_date(filepath, output_format, manifest):
+                tasks.append((filepath, output_format))
+
+    # Keep the modification times refreshed by _is_up_to_date(), even if nothing is extracted
+    _write_manifest(manifest_path, manifest)
+
+    print 'Extracting ' + str(len(tasks)) + ' spectrograms (' + \
+          str(100 * len(genres) - len(tasks)) + ' up to date)'
+    if len(tasks) == 0:
+        return
+
+    pool = multiprocessing.Pool(num_workers)
+    try:
+        start = time.time()
+        count = 0
+        for spectrogram_filepath, source_stamp, duration in \
+                pool.imap_unordered(_extract_spectrogram, tasks):
+            count += 1
+            print '[%d/%d] %s: %.2fs' % (count, len(tasks), spectrogram_filepath, duration)
+
+            # Record each extraction as soon as it is finished
+            manifest[spectrogram_filepath] = source_stamp
+            _write_manifest(manifest_path, manifest)
+
+        print 'Extracted %d spectrograms in %.1fs' % (count, time.time() - start)
+    finally:
+        pool.terminate()
+
+
+def _extract_spectrogram(task):
+    """
+    Extract the spectrogram of a single audio file.
 
-    # Create directory, if not already existent
-    dir_path = os.path.abspath(os.path.join(os.getcwd(), '../../spectrograms/', genre_name))
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
+    Parameters
+    ----------
+    task : tuple
+        The path of the audio file, relative to the dataset directory, and the output format
+
+    Returns
+    -------
+    tuple
+        The path of the spectrogram file, relative to the spectrograms directory, the stamp of the
+        audio file (see _source_stamp()) and the time taken
+    """
+    filepath, output_format = task
+    spectrogram_filepath = filepath[:-3] + output_format
 
-    # Produce a spectrogram for each audio file
-    for song_index in range(0, 100):
-        filepath = '000' + str(song_index) + '.wav'
-        if song_index < 10:
-            filepath = '0' + filepath
-        filepath = genre_name + '/' + genre_name + '.' + filepath
+    start = time.time()
+    audio_path = os.path.abspath(os.path.join(os.getcwd(), '../../genres/', filepath))
+    # Stamp the audio file before decoding it, so that a change made during the extraction is
+    # detected by the next run
+    source_stamp = _source_stamp(audio_path)
 
-        # Extract raw representation of signal from audio file
-        audio_time_series, sampling_rate = librosa.load(
-            os.path.abspath(os.path.join(os.getcwd(), '../../genres/', filepath)))
+    # Extract raw representation of signal from audio file
+    audio_time_series, sampling_rate = librosa.load(audio_path)
 
+    spectrogram_path = os.path.abspath(os.path.join(os.getcwd(), '../../spectrograms/',
+                                                    spectrogram_filepath))
+    if output_format == 'npy':
+        # Produce the log-mel values with 128 frequency bins, FFT window of 1024 samples, and save
+        # them directly
+        log_spectrogram = mel_frontend.log_mel_spectrograms(audio_time_series, sampling_rate,
+                                                            n_mels=128, n_fft=1024, fmax=10000)
+        numpy.save(spectrogram_path, log_spectrogram.astype(numpy.float32))
+    else:
         # Produce the spectrogram with 128 frequency bins, FFT window of 1024 samples
         spectrogram = librosa.feature.melspectrogram(y=audio_time_series, sr=sampling_rate,
                                                      n_mels=128, n_fft=1024, fmax=10000)
 
         # Save the spectrogram image
-        librosa.display.specshow(librosa.logamplitude(spectrogram, ref_power=numpy.max), fmax=10000)
+        librosa.display.specshow(librosa.logamplitude(spectrogram, ref_power=numpy.max),
+                                 fmax=10000)
         pylab.gcf().set_size_inches(7.72903226, 1.6)
-        pylab.savefig(os.path.abspath(os.path.join(os.getcwd(), '../../spectrograms/',
-                                                   filepath[:-3] + 'png')),
-                      bbox_inches='tight', pad_inches=0)
+        pylab.savefig(spectrogram_path, bbox_inches='tight', pad_inches=0)
+        # Do not keep the images of previous files in the figure of this worker
+        pylab.clf()
+
+    return spectrogram_filepath, source_stamp, time.time() - start
+
+
+def _audio_filepath(genre_name, song_index):
+    """
+    Parameters
+    ----------
+    genre_name : str
+        The name of the genre of the audio file
+    song_index : int
+        The index of the audio file
+
+    Returns
+    -------
+    str
+        The path of the audio file, relative to the dataset directory
+    """
+    filepath = '000' + str(song_index) + '.wav'
+    if song_index < 10:
+        filepath = '0' + filepath
+    return genre_name + '/' + genre_name + '.' + filepath
+
+
+def _source_stamp(audio_path):
+    """
+    Parameters
+    ----------
+    audio_path : str
+        The absolute path of an audio file
+
+    Returns
+    -------
+    dict
+        The modification time, size and MD5 hash of the audio file
+    """
+    md5 = hashlib.md5()
+    with open(audio_path, 'rb') as audio_file:
+        for chunk in iter(lambda: audio_file.read(1 << 20), ''):
+            md5.update(chunk)
+
+    return dict(mtime=os.path.getmtime(audio_path), size=os.path.getsize(audio_path),
+                md5=md5.hexdigest())
+
+
+def _is_up_to_date(filepath, output_format, manifest):
+    """
+    Parameters
+    ----------
+    filepath : str
+        The path of an audio file, relative to the dataset directory
+    output_format : str
+        The format of the spectrogram ('png' or 'npy')
+    manifest : dict
+        The stamps of the audio files at the last extraction of each spectrogram, indexed by the
+        path of the spectrogram
+
+    Returns
+    -------
+    bool
+        Whether the spectrogram of the audio file exists and the audio file is unchanged since its
+        extraction. The (slower) hash is only compared if the modification time has changed.
+    """
+    spectrogram_filepath = filepath[:-3] + output_format
+    audio_path = os.path.abspath(os.path.join(os.getcwd(), '../../genres/', filepath))
+    spectrogram_path = os.path.abspath(os.path.join(os.getcwd(), '../../spectrograms/',
+                                                    spectrogram_filepath))
+    if spectrogram_filepath not in manifest or not os.path.exists(spectrogram_path):
+        return False
+
+    stamp = manifest[spectrogram_filepath]
+    if os.path.getsize(audio_path) != stamp['size']:
+        return False
+    if os.path.getmtime(audio_path) == stamp['mtime']:
+        return True
+
+    if _source_stamp(audio_path)['md5'] == stamp['md5']:
+        # Only touched: record the new modification time to avoid hashing the file again
+        stamp['mtime'] = os.path.getmtime(audio_path)
+        return True
+    return False
+
+
+def _read_manifest(manifest_path):
+    """
+    Parameters
+    ----------
+    manifest_path : str
+        The path of the manifest file
+
+    Returns
+    -------
+    dict
+        The contents of the manifest, or an empty manifest if the file does not exist
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+
+    with open(manifest_path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def _write_manifest(manifest_path, manifest):
+    """
+    Parameters
+    ----------
+    manifest_path : str
+        The path of the manifest file
+    manifest : dict
+        The contents of the manifest
+    """
+    # Write to a temporary file first, so that an interruption never leaves a truncated manifest
+    with open(manifest_path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.rename(manifest_path + '.tmp', manifest_path)
 
 
 if __name__ == '__main__':
-    genres = ['blues', 'classical', 'country', 'disco', 'hiphop', 'jazz', 'metal', 'pop', 'reggae',
-              'rock']
-    for genre in genres:
-        spectrograms_for_genre(genre)
+    # The number of worker processes and the output format can be given as arguments
+    if len(sys.argv) > 2:
+        extract_spectrograms(GENRES, num_workers=int(sys.argv[1]), output_format=sys.argv[2])
+    elif len(sys.argv) > 1:
+        extract_spectrograms(GENRES, num_workers=int(sys.argv[1]))
+    else:
+        extract_spectrograms(GENRES)
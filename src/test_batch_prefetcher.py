@@ -0,0 +1,54 @@
+import threading
+import unittest
+
+from batch_prefetcher import BatchPrefetcher
+
+
+class FakeDataProvider(object):
+
+    def __init__(self, num_batches, fail_at=None):
+        self._batches = range(num_batches)
+        self._fail_at = fail_at
+        self.threads = set()
+
+    def get_next_batch(self):
+        self.threads.add(threading.current_thread())
+        if len(self._batches) == 0:
+            return None
+        if self._batches[0] == self._fail_at:
+            raise ValueError("Corrupted batch")
+        return self._batches.pop(0)
+
+
+class TestBatchPrefetcher(unittest.TestCase):
+
+    def test_iteration(self):
+        data_provider = FakeDataProvider(10)
+        batches = list(BatchPrefetcher(data_provider, num_batches=3))
+
+        self.assertEqual(batches, range(10))
+        # Batches are only retrieved on the worker thread
+        self.assertNotIn(threading.current_thread(), data_provider.threads)
+
+    def test_transform(self):
+        batches = list(BatchPrefetcher(FakeDataProvider(5), transform=lambda batch: batch * 2))
+        self.assertEqual(batches, [0, 2, 4, 6, 8])
+
+    def test_exception(self):
+        prefetcher = BatchPrefetcher(FakeDataProvider(10, fail_at=4), num_batches=2)
+
+        self.assertEqual([prefetcher.next() for i in range(4)], range(4))
+        with self.assertRaises(ValueError):
+            prefetcher.next()
+
+    def test_close(self):
+        data_provider = FakeDataProvider(100)
+        prefetcher = BatchPrefetcher(data_provider, num_batches=2)
+        self.assertEqual(prefetcher.next(), 0)
+
+        prefetcher.close()
+        # The worker stops without retrieving the remaining batches
+        self.assertGreater(len(data_provider._batches), 90)
+
+if __name__ == '__main__':
+    TestBatchPrefetcher.run()
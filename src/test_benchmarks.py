@@ -0,0 +1,30 @@
+import unittest
+
+from benchmarks import compare, measure
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_measure(self):
+        calls = []
+        stats = measure(lambda: calls.append(None), repeats=5, warmup=2)
+
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(stats['runs'], 5)
+        self.assertLessEqual(stats['min'], stats['median'])
+        self.assertLessEqual(stats['median'], stats['p90'])
+        self.assertLessEqual(stats['p90'], stats['max'])
+
+    def test_compare(self):
+        baseline = dict(benchmarks={'a': dict(median=1.0), 'b': dict(median=1.0),
+                                    'c': dict(median=1.0)})
+        results = dict(benchmarks={'a': dict(median=1.05), 'b': dict(median=1.5),
+                                   'd': dict(median=9.0)})
+
+        # Only the benchmarks present in both results are compared
+        self.assertEqual(compare(results, baseline, tolerance=0.1), [('b', 1.0, 1.5)])
+        self.assertEqual(compare(results, baseline, tolerance=0.0),
+                         [('a', 1.0, 1.05), ('b', 1.0, 1.5)])
+
+if __name__ == '__main__':
+    unittest.main()
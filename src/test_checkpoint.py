@@ -0,0 +1,103 @@
+import json
+import numpy as np
+import numpy.testing
+import os
+import shutil
+import tempfile
+import unittest
+
+from checkpoint import CheckpointWriter, get_random_state, load_checkpoint, \
+    read_checkpoint_header, save_checkpoint, set_random_state
+from fixtures import SMALL_INPUT_SHAPE, small_network
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir_path, 'network.ckpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_path)
+
+    def test_save_load(self):
+        layers = small_network()
+        layers[0].set_parameters([np.random.randn(4, 8, 3), np.random.randn(4)])
+        save_checkpoint(self.path, layers, SMALL_INPUT_SHAPE, metadata=dict(epoch=3))
+
+        header = read_checkpoint_header(self.path)
+        self.assertEqual(header['metadata'], dict(epoch=3))
+        self.assertEqual([layer['type'] for layer in header['layers']],
+                         ['ConvLayer', 'ActivationLayer', 'GlobalPoolingLayer',
+                          'FullyConnectedLayer', 'SoftmaxLayer'])
+
+        loaded_layers = small_network()
+        load_checkpoint(self.path, loaded_layers)
+
+        input = np.random.randn(*SMALL_INPUT_SHAPE)
+        expected_output = input
+        output = input
+        for layer, loaded_layer in zip(layers, loaded_layers):
+            expected_output = layer.forward_prop(expected_output)
+            output = loaded_layer.forward_prop(output)
+        numpy.testing.assert_array_almost_equal(output, expected_output)
+
+        # The parameters are aligned, read-only views of the file
+        for layer in [loaded_layers[0], loaded_layers[3]]:
+            for parameter in layer.get_parameters():
+                self.assertFalse(parameter.flags.writeable)
+                self.assertEqual(parameter.ctypes.data % 64, 0)
+
+    def test_copy_on_write(self):
+        save_checkpoint(self.path, small_network(), SMALL_INPUT_SHAPE)
+
+        layers = small_network()
+        load_checkpoint(self.path, layers, mode='c')
+        layers[3].get_parameters()[0][...] = 0
+
+        # The file is unchanged
+        loaded_layers = small_network()
+        load_checkpoint(self.path, loaded_layers)
+        self.assertTrue(np.any(loaded_layers[3].get_parameters()[0] != 0))
+
+    def test_architecture_mismatch(self):
+        save_checkpoint(self.path, small_network(), SMALL_INPUT_SHAPE)
+        self.assertRaises(ValueError, load_checkpoint, self.path, small_network(num_outputs=6))
+
+    def test_not_a_checkpoint(self):
+        with open(self.path, 'wb') as checkpoint_file:
+            checkpoint_file.write('not a checkpoint')
+        self.assertRaises(ValueError, read_checkpoint_header, self.path)
+
+    def test_writer(self):
+        layers = small_network()
+        expected_parameters = [parameter.copy() for parameter in layers[3].get_parameters()]
+
+        writer = CheckpointWriter()
+        writer.save(self.path, layers, SMALL_INPUT_SHAPE, metadata=dict(iteration=1))
+        # The parameters are copied before save() returns
+        layers[3].get_parameters()[0][...] = 0
+        writer.close()
+
+        loaded_layers = small_network()
+        self.assertEqual(load_checkpoint(self.path, loaded_layers)['metadata'],
+                         dict(iteration=1))
+        for parameter, expected_parameter in zip(loaded_layers[3].get_parameters(),
+                                                 expected_parameters):
+            numpy.testing.assert_array_equal(parameter, expected_parameter)
+
+    def test_writer_error(self):
+        writer = CheckpointWriter()
+        writer.save(os.path.join(self.dir_path, 'missing', 'network.ckpt'), small_network(),
+                    SMALL_INPUT_SHAPE)
+        self.assertRaises(IOError, writer.close)
+
+    def test_random_state(self):
+        state = get_random_state()
+        expected_values = np.random.randn(5)
+
+        set_random_state(json.loads(json.dumps(state)))
+        numpy.testing.assert_array_equal(np.random.randn(5), expected_values)
+
+if __name__ == '__main__':
+    unittest.main()
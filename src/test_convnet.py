@@ -0,0 +1,130 @@
+import functools
+import numpy as np
+import numpy.testing
+import os
+import shutil
+import tempfile
+import unittest
+
+from convnet import ConvNet
+from convnet_layers.activation_layer import ActivationLayer
+from data_provider import DataProvider
+from fixtures import SMALL_INPUT_SHAPE, small_network, write_cache
+
+
+class SingleExampleActivationLayer(ActivationLayer):
+
+    # Like the CUDA layers
+    supports_batch = False
+
+    def forward_prop(self, input, training=True, context=None):
+        assert input.shape == self._input_shape, "Input does not have correct shape"
+        return super(SingleExampleActivationLayer, self).forward_prop(input, training, context)
+
+
+class InterruptedDataProvider(DataProvider):
+
+    def __init__(self, num_calls, *args, **kwargs):
+        """
+
+        Raises KeyboardInterrupt on the given call of get_next_batch(), as if the training process
+        was killed.
+
+        """
+        super(InterruptedDataProvider, self).__init__(*args, **kwargs)
+        self._num_calls = num_calls
+
+    def get_next_batch(self):
+        self._num_calls -= 1
+        if self._num_calls == 0:
+            raise KeyboardInterrupt()
+        return super(InterruptedDataProvider, self).get_next_batch()
+
+
+class TestConvNet(unittest.TestCase):
+
+    def convnet(self, activation_layer):
+        convnet = ConvNet(small_network(activation_layer=activation_layer),
+                          DataProvider(5, genre_dataset_size=40))
+        convnet.setup_layers(SMALL_INPUT_SHAPE, (5,))
+        return convnet
+
+    def test_predict_batch(self):
+        convnet = self.convnet(ActivationLayer('leakyReLU'))
+
+        inputs = np.random.randn(7, 8, 12)
+        # The last of the batches of 3 inputs is incomplete
+        outputs = convnet.predict_batch(inputs, batch_size=3)
+        self.assertEqual(outputs.shape, (7, 5))
+        for input, output in zip(inputs, outputs):
+            numpy.testing.assert_array_almost_equal(output, convnet.predict(input))
+
+    def test_predict_batch_single_example_layer(self):
+        convnet = self.convnet(SingleExampleActivationLayer('leakyReLU'))
+
+        # The inputs are processed one at a time
+        inputs = np.random.randn(7, 8, 12)
+        outputs = convnet.predict_batch(inputs, batch_size=3)
+        for input, output in zip(inputs, outputs):
+            numpy.testing.assert_array_almost_equal(output, convnet.predict(input))
+
+    def test_resume_training(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            write_cache(cache_dir, num_frames=12)
+            checkpoint_path = os.path.join(cache_dir, 'training.ckpt')
+
+            def train(data_provider, seed, **kwargs):
+                np.random.seed(seed)
+                convnet = ConvNet(small_network(num_outputs=2, input_shape=(128, 12)),
+                                  data_provider(num_genres=2, genre_dataset_size=10,
+                                                cache_dir=cache_dir, num_frames=12))
+                convnet.train(learning_rate=0.1, num_iters=2, lrate_schedule=True, batch_size=2,
+                              **kwargs)
+                return convnet
+
+            expected_convnet = train(DataProvider, 0)
+
+            # Each iteration uses 5 batches, so the training is interrupted at the third batch of
+            # the second iteration, after the checkpoint saved after its second batch
+            self.assertRaises(KeyboardInterrupt, train,
+                              functools.partial(InterruptedDataProvider, 9), 0,
+                              checkpoint_path=checkpoint_path, checkpoint_interval=2)
+
+            # The resumed training does not depend on the initial state of the new process
+            convnet = train(DataProvider, 1, checkpoint_path=checkpoint_path,
+                            checkpoint_interval=2, resume=True)
+
+            for layer, expected_layer in zip(convnet._parameter_layers(),
+                                             expected_convnet._parameter_layers()):
+                for parameter, expected_parameter in zip(layer.get_parameters(),
+                                                         expected_layer.get_parameters()):
+                    numpy.testing.assert_array_equal(parameter, expected_parameter)
+            self.assertEqual(convnet.results['test_loss'], expected_convnet.results['test_loss'])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_feature_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            write_cache(cache_dir, num_frames=12)
+            feature_cache = os.path.join(cache_dir, 'features.npy')
+
+            convnet = ConvNet(small_network(num_outputs=2, input_shape=(128, 12)),
+                              DataProvider(num_genres=2, genre_dataset_size=10,
+                                           cache_dir=cache_dir, num_frames=12))
+            convnet.train(learning_rate=0.1, num_iters=1, batch_size=2, num_frozen_layers=3,
+                          feature_cache=feature_cache)
+            # The saved features are used while the frozen layers are unchanged
+            convnet.train(learning_rate=0.1, num_iters=1, batch_size=2, num_frozen_layers=3,
+                          feature_cache=feature_cache)
+
+            # The features are stale once the parameters of a frozen layer change
+            convnet._layers[0].get_parameters()[0][...] += 0.1
+            self.assertRaises(ValueError, convnet.train, learning_rate=0.1, num_iters=1,
+                              batch_size=2, num_frozen_layers=3, feature_cache=feature_cache)
+        finally:
+            shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import copy
+import numpy as np
+import numpy.testing
+import unittest
+
+from data_parallel_trainer import DataParallelTrainer
+from fixtures import small_network
+
+
+class Network(object):
+
+    def __init__(self):
+        self.layers = small_network()
+
+    def parameter_layers(self):
+        return [self.layers[0], self.layers[3]]
+
+    def compute_derivatives(self, input, true_output):
+        for layer in self.layers:
+            input = layer.forward_prop(input)
+
+        gradient = self.layers[-1].initial_gradient(input, true_output)
+        for layer in reversed(self.layers[:-1]):
+            gradient = layer.back_prop(gradient)
+
+
+class TestDataParallelTrainer(unittest.TestCase):
+
+    def setUp(self):
+        self.network = Network()
+        self.inputs = np.random.randn(3, 7, 8, 12)
+        self.true_outputs = np.eye(5)[np.random.randint(5, size=(3, 7))]
+
+    def test_synchronous(self):
+        # Train a copy of the network on whole minibatches in this process
+        network = copy.deepcopy(self.network)
+        for input, true_output in zip(self.inputs, self.true_outputs):
+            network.compute_derivatives(input, true_output)
+            for layer in network.parameter_layers():
+                layer.update_parameters(0.1 / input.shape[0])
+
+        trainer = DataParallelTrainer(self.network.parameter_layers(),
+                                      self.network.compute_derivatives, (8, 12), (5,), 7,
+                                      num_workers=3)
+        try:
+            for input, true_output in zip(self.inputs, self.true_outputs):
+                trainer.train_step(input, true_output, 0.1)
+        finally:
+            trainer.close()
+
+        for layer, expected_layer in zip(self.network.parameter_layers(),
+                                         network.parameter_layers()):
+            for parameter, expected_parameter in zip(layer.get_parameters(),
+                                                     expected_layer.get_parameters()):
+                numpy.testing.assert_array_almost_equal(parameter, expected_parameter)
+
+    def test_hogwild(self):
+        initial_parameters = [parameter.copy() for layer in self.network.parameter_layers()
+                              for parameter in layer.get_parameters()]
+
+        trainer = DataParallelTrainer(self.network.parameter_layers(),
+                                      self.network.compute_derivatives, (8, 12), (5,), 7,
+                                      num_workers=2, hogwild=True)
+        try:
+            for input, true_output in zip(self.inputs, self.true_outputs):
+                trainer.train_step(input, true_output, 0.1)
+        finally:
+            trainer.close()
+
+        # The workers have updated the shared parameters
+        parameters = [parameter for layer in self.network.parameter_layers()
+                      for parameter in layer.get_parameters()]
+        for parameter, initial_parameter in zip(parameters, initial_parameters):
+            self.assertTrue(np.all(np.isfinite(parameter)))
+            self.assertFalse(np.array_equal(parameter, initial_parameter))
+
+    def test_worker_exception(self):
+        def compute_derivatives(input, true_output):
+            raise ValueError("Corrupted batch")
+
+        trainer = DataParallelTrainer(self.network.parameter_layers(), compute_derivatives,
+                                      (8, 12), (5,), 7, num_workers=2)
+        try:
+            self.assertRaises(RuntimeError, trainer.train_step, self.inputs[0],
+                              self.true_outputs[0], 0.1)
+        finally:
+            trainer.close()
+
+if __name__ == '__main__':
+    unittest.main()
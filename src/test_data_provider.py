@@ -1,8 +1,12 @@
 import numpy
 from numpy import testing
+import os
+import shutil
+import tempfile
 import unittest
 
 from data_provider import DataProvider
+from fixtures import write_cache
 
 
 class TestDataProvider(unittest.TestCase):
@@ -19,14 +23,13 @@ class TestDataProvider(unittest.TestCase):
         training_data = self.data_provider.get_all_training_data()
         test_data = self.data_provider.get_test_data()
         # Check proportions of training and test sets
-        self.assertEqual(training_data.shape[0], 180)
-        self.assertEqual(test_data.shape[0], 20)
-
-        ids = numpy.array([])
-        for example in training_data:
-            ids = numpy.append(ids, example['id'])
-        for example in test_data:
-            ids = numpy.append(ids, example['id'])
+        self.assertEqual(training_data.ids.shape[0], 180)
+        self.assertEqual(test_data.ids.shape[0], 20)
+
+        self.assertEqual(training_data.specs.shape, (180, 128, 599))
+        self.assertEqual(test_data.specs.shape, (20, 128, 599))
+
+        ids = numpy.append(training_data.ids, test_data.ids)
         # Check the reunion of training and test examples gives the entire dataset
         numpy.testing.assert_array_equal(numpy.sort(ids), numpy.sort(numpy.array(5 * (range(40)))))
 
@@ -36,37 +39,33 @@ class TestDataProvider(unittest.TestCase):
         genres_count = numpy.zeros((5, ), dtype=int)
         for i in range(18):
             batch = self.data_provider.get_next_batch()
-            for example in batch:
-                genres_count[numpy.argmax(example['out'])] += 1
+            self.assertEqual(batch.labels.shape[0], self.data_provider.get_batch_size())
+            for label in batch.labels:
+                genres_count[label] += 1
         numpy.testing.assert_array_equal(genres_count, numpy.array([36, 36, 36, 36, 36]))
 
     def test_get_all_training_data(self):
         self.data_provider.setup()
 
         training_data = self.data_provider.get_all_training_data()
-        ids = numpy.array([])
-        for example in training_data:
+        for id in training_data.ids:
             # Check training examples have ids from the dataset range
-            self.assertIn(example['id'], range(40))
-            ids = numpy.append(ids, example['id'])
+            self.assertIn(id, range(40))
 
     def test_get_test_data(self):
         self.data_provider.setup()
 
         test_data = self.data_provider.get_test_data()
-        ids = numpy.array([])
-        for example in test_data:
+        for id in test_data.ids:
             # Check test examples have ids from the dataset range
-            self.assertIn(example['id'], range(40))
-            ids = numpy.append(ids, example['id'])
+            self.assertIn(id, range(40))
 
     def test_get_test_data_for_genre(self):
         self.data_provider.setup()
 
         test_data_genre = self.data_provider.get_test_data_for_genre('classical')
-        ids = numpy.array([])
-        for example in test_data_genre:
-            ids = numpy.append(ids, example['id'])
+        ids = numpy.sort(test_data_genre.ids)
+        numpy.testing.assert_array_equal(test_data_genre.labels, numpy.zeros(4))
         # Check test set for 1 genre does not contain duplicates
         numpy.testing.assert_array_equal(numpy.unique(ids), ids)
         # Check size of test set per genre
@@ -88,5 +87,151 @@ class TestDataProvider(unittest.TestCase):
             batch = self.data_provider.get_next_batch()
             self.assertIsNotNone(batch)
 
+    def test_setup_from_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            write_cache(cache_dir)
+
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir)
+            data_provider.setup()
+
+            for batch in [data_provider.get_all_training_data(), data_provider.get_test_data(),
+                          data_provider.get_next_batch()]:
+                self.assertEqual(batch.specs.shape[1:], (128, 599))
+                numpy.testing.assert_array_almost_equal(batch.specs[:, 0, 0],
+                                                        (batch.labels * 100 + batch.ids) / 1000.0)
+                numpy.testing.assert_array_less(batch.labels, 5)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_missing_from_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            # Leave out the example of id 7 of the second genre
+            keep = numpy.ones(400, dtype=bool)
+            keep[47] = False
+            write_cache(cache_dir, keep=keep)
+
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir)
+            self.assertRaises(ValueError, data_provider.setup)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cache_mismatch(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            write_cache(cache_dir)
+            # The cache was built for the spectrogram images
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir,
+                                         spectrogram_format='npy')
+            self.assertRaises(ValueError, data_provider.setup)
+
+            # The spectrograms do not have the recorded number of frames
+            write_cache(cache_dir, info=dict(num_frames=600))
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir,
+                                         num_frames=600)
+            self.assertRaises(ValueError, data_provider.setup)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_build_cache(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+        try:
+            # The files of an interrupted build are discarded
+            os.makedirs(cache_dir + '.tmp')
+            numpy.save(os.path.join(cache_dir + '.tmp', 'specs.npy'), numpy.zeros(1))
+
+            self.data_provider.build_cache(cache_dir)
+            self.assertFalse(os.path.exists(cache_dir + '.tmp'))
+
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir)
+            data_provider.setup()
+            self.assertEqual(data_provider.get_test_data().specs.shape, (20, 128, 599))
+
+            # The cache does not have enough examples per genre
+            data_provider = DataProvider(5, genre_dataset_size=50, cache_dir=cache_dir)
+            self.assertRaises(ValueError, data_provider.setup)
+        finally:
+            shutil.rmtree(os.path.dirname(cache_dir))
+
+    def test_compute_features(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            write_cache(cache_dir)
+
+            data_provider = DataProvider(5, genre_dataset_size=40, cache_dir=cache_dir)
+            data_provider.setup()
+
+            calls = []
+
+            def interrupted_transform(inputs):
+                calls.append(inputs.shape[0])
+                if len(calls) > 1:
+                    raise KeyboardInterrupt()
+                return inputs[:, 0]
+
+            # A computation interrupted after the first batch does not leave a feature cache
+            # behind
+            feature_cache = os.path.join(cache_dir, 'features.npy')
+            self.assertRaises(KeyboardInterrupt, data_provider.compute_features,
+                              interrupted_transform, cache_path=feature_cache)
+            self.assertFalse(os.path.exists(feature_cache))
+
+            def transform(inputs):
+                num_transformed.append(inputs.shape[0])
+                return inputs[:, 0]
+
+            # The features of each spectrogram are its first row. Only the 200 examples of the 5
+            # genres used are transformed, not the 400 of the cache
+            num_transformed = []
+            data_provider.compute_features(transform, cache_path=feature_cache,
+                                           feature_shape=(599,))
+            self.assertEqual(sum(num_transformed), 200)
+            self.assertFalse(os.path.exists(feature_cache + '.tmp'))
+            batch = data_provider.get_next_batch()
+            self.assertEqual(batch.specs.shape[1:], (599,))
+            numpy.testing.assert_array_almost_equal(batch.specs[:, 0],
+                                                    (batch.labels * 100 + batch.ids) / 1000.0)
+
+            # The saved features are used instead of computing them again
+            data_provider.compute_features(None, cache_path=feature_cache)
+            batch = data_provider.get_test_data()
+            numpy.testing.assert_array_almost_equal(batch.specs[:, 0],
+                                                    (batch.labels * 100 + batch.ids) / 1000.0)
+
+            # The saved features were computed by another transform, or from other examples
+            self.assertRaises(ValueError, data_provider.compute_features, None,
+                              cache_path=feature_cache, fingerprint='other transform')
+            other_data_provider = DataProvider(4, genre_dataset_size=40, cache_dir=cache_dir)
+            other_data_provider.setup()
+            self.assertRaises(ValueError, other_data_provider.compute_features, None,
+                              cache_path=feature_cache)
+
+            # The saved features do not have the shape of the features of another transform
+            self.assertRaises(ValueError, data_provider.compute_features, None,
+                              cache_path=feature_cache, feature_shape=(128,))
+
+            data_provider.clear_features()
+            self.assertEqual(data_provider.get_test_data().specs.shape[1:], (128, 599))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_read_log_mel(self):
+        data_provider = DataProvider(5, genre_dataset_size=40, spectrogram_format='npy',
+                                     num_frames=4)
+        self.assertEqual(data_provider.get_input_shape(), (128, 4))
+
+        log_mel_file = tempfile.NamedTemporaryFile(suffix='.npy', delete=False)
+        try:
+            numpy.save(log_mel_file, numpy.tile(numpy.array([-80, -40, 0], dtype=numpy.float32),
+                                                (128, 1)))
+            log_mel_file.close()
+
+            # Values are scaled to [0, 1] and missing frames are padded with silence
+            spec = data_provider._read_log_mel(log_mel_file.name)
+            numpy.testing.assert_array_equal(spec, numpy.tile([0, 0.5, 1, 0], (128, 1)))
+        finally:
+            os.remove(log_mel_file.name)
+
 if __name__ == '__main__':
     TestDataProvider.run()
@@ -0,0 +1,39 @@
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+from experiment_runner import run_experiments
+
+
+def fake_experiment(run_idx):
+    return dict(test=0.5, conf_matrix=np.eye(2) * run_idx, sample=np.random.rand())
+
+
+class TestExperimentRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+        self.results_path = os.path.join(self.results_dir, 'results.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_run_experiments(self):
+        summary = run_experiments(fake_experiment, range(1, 5), num_workers=2,
+                                  results_path=self.results_path)
+
+        with open(self.results_path) as results_file:
+            self.assertEqual(json.load(results_file), summary)
+
+        self.assertEqual(summary['experiment'], 'fake_experiment')
+        runs = sorted(summary['runs'], key=lambda run: run['run'])
+        self.assertEqual([run['run'] for run in runs], range(1, 5))
+        self.assertEqual(runs[2]['results']['conf_matrix'], [[3.0, 0.0], [0.0, 3.0]])
+        # Each run is seeded separately
+        self.assertEqual(len(set(run['results']['sample'] for run in runs)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import numpy as np
+import unittest
+
+from convnet_layers.activation_layer import ActivationLayer
+from convnet_layers.fullyconnected_layer import FullyConnectedLayer
+from convnet_layers.softmax_layer import SoftmaxLayer
+from fixtures import setup_layers
+from layer_profiler import LayerProfiler
+
+
+class TestLayerProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.layers = setup_layers([FullyConnectedLayer(6, 0.1), ActivationLayer('leakyReLU'),
+                                    FullyConnectedLayer(3, 0.1), SoftmaxLayer()], (4,))
+
+    def train_step(self, profiler, input, true_output):
+        for layer in self.layers:
+            input = profiler.call(layer, 'forward', layer.forward_prop, input)
+
+        gradient = profiler.call(self.layers[-1], 'backward', self.layers[-1].initial_gradient,
+                                 input, true_output)
+        for layer in reversed(self.layers[:-1]):
+            gradient = profiler.call(layer, 'backward', layer.back_prop, gradient)
+
+        for layer in [self.layers[0], self.layers[2]]:
+            profiler.call(layer, 'update', layer.update_parameters, 0.1)
+
+    def test_report(self):
+        calls = []
+        profiler = LayerProfiler(self.layers, callback=lambda *args: calls.append(args))
+
+        inputs = np.random.randn(2, 5, 4)
+        true_outputs = np.eye(3)[np.random.randint(3, size=(2, 5))]
+        for input, true_output in zip(inputs, true_outputs):
+            self.train_step(profiler, input, true_output)
+
+        report = profiler.report()
+        self.assertEqual([(row['layer'], row['phase']) for row in report],
+                         [(0, 'forward'), (0, 'backward'), (0, 'update'),
+                          (1, 'forward'), (1, 'backward'),
+                          (2, 'forward'), (2, 'backward'), (2, 'update'),
+                          (3, 'forward'), (3, 'backward')])
+        self.assertEqual(len(calls), sum(row['calls'] for row in report))
+        self.assertAlmostEqual(sum(row['fraction'] for row in report), 1.0)
+
+        for row in report:
+            self.assertEqual(row['name'], type(self.layers[row['layer']]).__name__)
+            self.assertEqual(row['calls'], 2)
+            self.assertGreaterEqual(row['time'], 0.0)
+
+        # Forward outputs of the first layer: two batches of 5 x 6 doubles
+        self.assertEqual(report[0]['bytes'], 2 * 5 * 6 * 8)
+        # update_parameters() returns nothing
+        self.assertEqual(report[2]['bytes'], 0)
+
+        profiler.reset()
+        self.assertEqual(profiler.report(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import numpy
+from numpy import testing
+import unittest
+
+import mel_frontend
+
+
+class TestMelFrontend(unittest.TestCase):
+
+    def setUp(self):
+        self.sampling_rate = 22050
+        time = numpy.arange(self.sampling_rate) / float(self.sampling_rate)
+        # One second of a 440Hz tone and of a 4kHz tone
+        self.signals = numpy.array([numpy.sin(2 * numpy.pi * 440 * time),
+                                    numpy.sin(2 * numpy.pi * 4000 * time)])
+
+    def test_mel_filterbank(self):
+        filterbank = mel_frontend.mel_filterbank(self.sampling_rate, 1024, n_mels=128, fmax=10000)
+
+        self.assertEqual(filterbank.shape, (128, 513))
+        self.assertTrue(numpy.all(filterbank >= 0))
+        # No frequency above fmax is used
+        self.assertTrue(numpy.all(filterbank[:, 10000 * 1024 / self.sampling_rate + 1:] == 0))
+        # The filterbank is only computed once for the same parameters
+        self.assertIs(mel_frontend.mel_filterbank(self.sampling_rate, 1024, n_mels=128,
+                                                  fmax=10000), filterbank)
+
+    def test_mel_spectrograms_shape(self):
+        spectrograms = mel_frontend.mel_spectrograms(self.signals, self.sampling_rate)
+        # Frames are centred on multiples of the hop length
+        self.assertEqual(spectrograms.shape, (2, 128, 1 + self.sampling_rate / 512))
+
+    def test_mel_spectrograms_batch(self):
+        spectrograms = mel_frontend.mel_spectrograms(self.signals, self.sampling_rate)
+
+        for clip in range(2):
+            numpy.testing.assert_array_almost_equal(
+                mel_frontend.mel_spectrograms(self.signals[clip], self.sampling_rate),
+                spectrograms[clip])
+
+    def test_mel_spectrograms_tones(self):
+        spectrograms = mel_frontend.mel_spectrograms(self.signals, self.sampling_rate)
+        filterbank = mel_frontend.mel_filterbank(self.sampling_rate, 1024, n_mels=128, fmax=10000)
+
+        # The loudest mel bin of each tone is one whose filter covers the tone frequency
+        for clip, frequency in enumerate([440, 4000]):
+            loudest_bin = numpy.argmax(numpy.mean(spectrograms[clip], axis=1))
+            fft_bin = int(round(frequency * 1024.0 / self.sampling_rate))
+            self.assertGreater(filterbank[loudest_bin, fft_bin], 0)
+
+    def test_log_mel_spectrograms(self):
+        log_spectrograms = mel_frontend.log_mel_spectrograms(self.signals, self.sampling_rate)
+
+        # Each spectrogram is relative to its own maximum and clipped 80dB below it
+        numpy.testing.assert_array_almost_equal(numpy.amax(log_spectrograms, axis=(1, 2)), [0, 0])
+        self.assertAlmostEqual(numpy.amin(log_spectrograms), -80)
+
+    def test_librosa_reference(self):
+        # Reference values computed by librosa for the sum of both tones, with
+        #   librosa.filters.mel(sr=22050, n_fft=1024, n_mels=128, fmax=10000)
+        #   librosa.feature.melspectrogram(y=signal, sr=22050, n_fft=1024, hop_length=512,
+        #                                  n_mels=128, fmax=10000, pad_mode='reflect')
+        # librosa's filterbank is float32, hence the tolerance
+        filterbank = mel_frontend.mel_filterbank(self.sampling_rate, 1024, n_mels=128, fmax=10000)
+        for (mel_bin, fft_bin), value in [((0, 1), 3.428808972e-02), ((10, 13), 3.310383111e-02),
+                                          ((40, 48), 3.081418574e-02),
+                                          ((100, 225), 7.660200354e-03),
+                                          ((127, 464), 1.337341528e-04)]:
+            numpy.testing.assert_allclose(filterbank[mel_bin, fft_bin], value, rtol=1e-6)
+
+        spectrogram = mel_frontend.mel_spectrograms(numpy.sum(self.signals, axis=0),
+                                                    self.sampling_rate)
+        for (mel_bin, frame), value in [((17, 0), 6.523000217e+02), ((17, 20), 2.021031233e+03),
+                                        ((93, 20), 5.092757385e+02), ((93, 43), 4.351376394e+02),
+                                        ((5, 20), 6.308645760e-05), ((120, 20), 2.357678364e-12)]:
+            numpy.testing.assert_allclose(spectrogram[mel_bin, frame], value, rtol=1e-6)
+
+if __name__ == '__main__':
+    TestMelFrontend.run()
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import spectrogram_extract
+
+
+class TestSpectrogramExtract(unittest.TestCase):
+
+    def setUp(self):
+        # The audio files and spectrograms are found relative to the working directory, in
+        # ../../genres/ and ../../spectrograms/
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'src', 'run'))
+        os.chdir(os.path.join(self.root, 'src', 'run'))
+
+        self.manifest_path = os.path.join(self.root, 'spectrograms', 'manifest.json')
+        self.manifest = {}
+        for song_index in range(100):
+            self.write_audio(song_index, 'audio ' + str(song_index))
+            self.write_spectrogram(song_index, 'png')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def audio_path(self, song_index):
+        return os.path.join(self.root, 'genres', spectrogram_extract._audio_filepath('blues',
+                                                                                     song_index))
+
+    def write_audio(self, song_index, content):
+        if not os.path.exists(os.path.dirname(self.audio_path(song_index))):
+            os.makedirs(os.path.dirname(self.audio_path(song_index)))
+        with open(self.audio_path(song_index), 'wb') as audio_file:
+            audio_file.write(content)
+
+    def touch(self, song_index):
+        mtime = os.path.getmtime(self.audio_path(song_index)) + 10
+        os.utime(self.audio_path(song_index), (mtime, mtime))
+        # As stored by the file system
+        return os.path.getmtime(self.audio_path(song_index))
+
+    def write_spectrogram(self, song_index, output_format):
+        """
+
+        Writes the spectrogram of an audio file and records its extraction in the manifest, as
+        extract_spectrograms() does.
+
+        """
+        spectrogram_filepath = spectrogram_extract._audio_filepath('blues', song_index)[:-3] + \
+            output_format
+        spectrogram_path = os.path.join(self.root, 'spectrograms', spectrogram_filepath)
+        if not os.path.exists(os.path.dirname(spectrogram_path)):
+            os.makedirs(os.path.dirname(spectrogram_path))
+        with open(spectrogram_path, 'wb') as spectrogram_file:
+            spectrogram_file.write('spectrogram')
+
+        self.manifest[spectrogram_filepath] = \
+            spectrogram_extract._source_stamp(self.audio_path(song_index))
+        return spectrogram_path
+
+    def is_up_to_date(self, song_index, output_format='png'):
+        return spectrogram_extract._is_up_to_date(
+            spectrogram_extract._audio_filepath('blues', song_index), output_format,
+            self.manifest)
+
+    def test_unchanged(self):
+        self.assertTrue(self.is_up_to_date(3))
+
+        # Only touched: the modification time is refreshed in the manifest
+        mtime = self.touch(3)
+        self.assertTrue(self.is_up_to_date(3))
+        self.assertEqual(self.manifest['blues/blues.00003.png']['mtime'], mtime)
+
+    def test_changed(self):
+        # Same size, but another content and modification time
+        self.write_audio(3, 'audio 4')
+        self.touch(3)
+        self.assertFalse(self.is_up_to_date(3))
+
+        # Another size, with the recorded modification time
+        self.write_audio(4, 'new audio 4')
+        os.utime(self.audio_path(4), (self.manifest['blues/blues.00004.png']['mtime'],) * 2)
+        self.assertFalse(self.is_up_to_date(4))
+
+    def test_missing_spectrogram(self):
+        os.remove(os.path.join(self.root, 'spectrograms', 'blues', 'blues.00003.png'))
+        self.assertFalse(self.is_up_to_date(3))
+
+    def test_output_format(self):
+        # The spectrograms of each format are recorded separately
+        self.assertFalse(self.is_up_to_date(3, 'npy'))
+
+        self.write_spectrogram(3, 'npy')
+        self.assertTrue(self.is_up_to_date(3, 'npy'))
+        self.assertTrue(self.is_up_to_date(3, 'png'))
+
+        # A spectrogram which is not recorded in the manifest is extracted again
+        del self.manifest['blues/blues.00003.npy']
+        self.assertFalse(self.is_up_to_date(3, 'npy'))
+
+    def test_manifest(self):
+        self.assertEqual(spectrogram_extract._read_manifest(self.manifest_path), {})
+
+        spectrogram_extract._write_manifest(self.manifest_path, self.manifest)
+        self.assertFalse(os.path.exists(self.manifest_path + '.tmp'))
+        self.assertEqual(spectrogram_extract._read_manifest(self.manifest_path), self.manifest)
+
+    def test_nothing_to_extract(self):
+        spectrogram_extract._write_manifest(self.manifest_path, self.manifest)
+        mtime = self.touch(3)
+
+        # All spectrograms are up to date, but the refreshed modification time is saved
+        spectrogram_extract.extract_spectrograms(['blues'], num_workers=1,
+                                                 manifest_path=self.manifest_path)
+        with open(self.manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(manifest['blues/blues.00003.png']['mtime'], mtime)
+
+if __name__ == '__main__':
+    unittest.main()